@@ -1,12 +1,35 @@
+from __future__ import annotations
+
 import typer
+import asyncio
+import functools
+import hashlib
+import json
+import multiprocessing
 import os
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, StorageContext, load_index_from_storage
-import pdfplumber
-from sentence_transformers import SentenceTransformer, util
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, TYPE_CHECKING
+
+# The heavy modules are imported in the functions using them to keep the CLI startup fast
+if TYPE_CHECKING:
+    import numpy as np
+    import torch
+    from sentence_transformers import SentenceTransformer
 
 app = typer.Typer()
 PDF_DIR = ".\\data"
 INDEX_DIR = 'index_storage'
+PAGES_PER_TASK = 16  # Number of PDF pages extracted per worker task
+MODEL_NAME = 'all-MiniLM-L6-v2'
+MANIFEST_FILE = 'manifest.json'
+CACHE_DB = os.path.join(os.path.expanduser('~'), '.cache', 'ai_cli', 'semcache.db')
+SIMILARITY_THRESHOLD = 0.95  # Minimum cosine similarity for a cached search response to be reused
+CACHE_MAX_ENTRIES = 1000  # Number of most recent search responses kept in the cache per index
+ARGPARTITION_THRESHOLD = 10000  # Number of scores above which the top sentences are selected with NumPy
+# Candidate summary sentences are lines with more than five words
+SENTENCE_RE = re.compile(r'^[^\S\n]*\S+(?:[^\S\n]+\S+){5}[^\n]*', re.MULTILINE)
 
 import os
 from dotenv import load_dotenv
@@ -16,42 +39,298 @@ load_dotenv()  # Loads variables from .env into environment
 secret_token = os.getenv("OPENAI_API_KEY")
 #print(secret_token)
 
+def _file_signature(entry: os.DirEntry) -> str:
+    """Return a hash of the file path, modification time and size."""
+    stat = entry.stat()
+    return hashlib.sha1(f'{entry.path}|{stat.st_mtime}|{stat.st_size}'.encode()).hexdigest()
+
+
 @app.command()
 def build_index(pdf_dir: str = PDF_DIR, index_dir: str = INDEX_DIR):
-    documents = SimpleDirectoryReader(pdf_dir).load_data()
-    index = VectorStoreIndex.from_documents(documents)
+    from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, StorageContext, load_index_from_storage
+    with os.scandir(pdf_dir) as entries:
+        signatures = {entry.path: _file_signature(entry) for entry in entries
+                      if entry.is_file() and not entry.name.startswith('.')}
+    # The manifest records the signature and the document ids of each embedded file
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        index = load_index_from_storage(StorageContext.from_defaults(persist_dir=index_dir))
+    else:
+        manifest = {}
+        index = VectorStoreIndex.from_documents([])
+    # Remove the documents of deleted and modified files
+    for path, entry in list(manifest.items()):
+        if signatures.get(path) != entry['signature']:
+            for doc_id in entry['doc_ids']:
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+            del manifest[path]
+    # Only embed new and modified files
+    changed = [path for path in signatures if path not in manifest]
+    for path in changed:
+        documents = SimpleDirectoryReader(input_files=[path]).load_data()
+        for document in documents:
+            index.insert(document)
+        manifest[path] = {'signature': signatures[path], 'doc_ids': [document.doc_id for document in documents]}
     index.storage_context.persist(persist_dir=index_dir)
-    typer.echo(f"Index built and saved to {index_dir}")
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    typer.echo(f"Index built and saved to {index_dir} ({len(changed)} of {len(signatures)} files embedded)")
 
-@app.command()
-def search(query: str, index_dir: str = INDEX_DIR):
+
+def _load_model() -> SentenceTransformer:
+    """Load the sentence transformer on the fastest available device, in half precision on CUDA."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if torch.cuda.is_available():
+        device = 'cuda'
+    elif torch.backends.mps.is_available():
+        device = 'mps'
+    else:
+        device = 'cpu'
+    model = SentenceTransformer(MODEL_NAME, device=device)
+    if device == 'cuda':
+        model.half()
+    return model
+
+
+class SemanticCache:
+    """Cache of search responses, looked up by the cosine similarity of the query embeddings."""
+
+    def __init__(self, index_dir: str, db_path: str = CACHE_DB, model: SentenceTransformer | None = None):
+        # The model is loaded on the first embedding
+        self.model = model
+        # Responses are only valid for the index they were created from
+        self.index_dir = os.path.abspath(index_dir)
+        with os.scandir(index_dir) as entries:
+            self.index_mtime = max((entry.stat().st_mtime for entry in entries), default=0)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        # Replaces the earlier cache table, which was not keyed on the index directory
+        self.connection.execute('DROP TABLE IF EXISTS cache')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS search_cache '
+                                '(index_dir TEXT, index_mtime REAL, embedding BLOB, response TEXT)')
+        self.connection.execute('DELETE FROM search_cache WHERE index_dir = ? AND index_mtime != ?',
+                                (self.index_dir, self.index_mtime))
+        self.connection.commit()
+        self._embeddings = None
+        self._responses = None
+
+    def _load(self):
+        """Read the cached embeddings and responses of the index once."""
+        import numpy as np
+        if self._embeddings is None:
+            rows = self.connection.execute('SELECT embedding, response FROM search_cache '
+                                           'WHERE index_dir = ? AND index_mtime = ? ORDER BY rowid',
+                                           (self.index_dir, self.index_mtime)).fetchall()
+            self._embeddings = [np.frombuffer(embedding, dtype=np.float32) for embedding, _ in rows]
+            self._responses = [response for _, response in rows]
+
+    def is_empty(self) -> bool:
+        self._load()
+        return not self._responses
+
+    def embed(self, query: str) -> np.ndarray:
+        import numpy as np
+        import torch
+        if self.model is None:
+            self.model = _load_model()
+        with torch.inference_mode():
+            return self.model.encode(query, normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, query_embedding: np.ndarray) -> str | None:
+        import numpy as np
+        if self.is_empty():
+            return None
+        scores = np.stack(self._embeddings) @ query_embedding
+        best = int(np.argmax(scores))
+        return self._responses[best] if scores[best] > SIMILARITY_THRESHOLD else None
+
+    def store(self, query_embedding: np.ndarray, response: str):
+        self._load()
+        self.connection.execute('INSERT INTO search_cache VALUES (?, ?, ?, ?)',
+                                (self.index_dir, self.index_mtime, query_embedding.tobytes(), response))
+        # Keep only the most recent responses of the index
+        self.connection.execute('DELETE FROM search_cache WHERE index_dir = ? AND rowid NOT IN '
+                                '(SELECT rowid FROM search_cache WHERE index_dir = ? ORDER BY rowid DESC LIMIT ?)',
+                                (self.index_dir, self.index_dir, CACHE_MAX_ENTRIES))
+        self.connection.commit()
+        self._embeddings = (self._embeddings + [query_embedding])[-CACHE_MAX_ENTRIES:]
+        self._responses = (self._responses + [response])[-CACHE_MAX_ENTRIES:]
+
+
+def _cached_query(query: str, load_query_engine: Callable, cache: SemanticCache) -> str:
+    """Return the cached response of a similar query, or query the engine and cache the response.
+
+    The query engine is only loaded when the response is not cached.
+    """
+    if cache.is_empty():
+        # Nothing to reuse, so load the query engine while the query is embedded for storing the response
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            query_engine = executor.submit(load_query_engine)
+            query_embedding = cache.embed(query)
+            response = str(query_engine.result().query(query))
+    else:
+        query_embedding = cache.embed(query)
+        response = cache.lookup(query_embedding)
+        if response is not None:
+            return response
+        response = str(load_query_engine().query(query))
+    cache.store(query_embedding, response)
+    return response
+
+
+@functools.lru_cache
+def _load_query_engine(index_dir: str):
+    from llama_index.core import StorageContext, load_index_from_storage
     storage_context = StorageContext.from_defaults(persist_dir=index_dir)
     index = load_index_from_storage(storage_context)
-    query_engine = index.as_query_engine()
-    response = query_engine.query(query)
-    typer.echo(response)
+    return index.as_query_engine()
+
+
+@app.command()
+def search(query: str, index_dir: str = INDEX_DIR):
+    cache = SemanticCache(index_dir)
+    typer.echo(_cached_query(query, functools.partial(_load_query_engine, index_dir), cache))
+
+
+@app.command()
+def search_many(queries: List[str], index_dir: str = INDEX_DIR):
+    """Answer several queries concurrently with a single query engine."""
+    cache = SemanticCache(index_dir)
+    query_embeddings = [cache.embed(query) for query in queries]
+    responses = [cache.lookup(query_embedding) for query_embedding in query_embeddings]
+    misses = [i for i, response in enumerate(responses) if response is None]
+    if not misses:
+        for query, response in zip(queries, responses):
+            typer.echo(f"{query}:\n{response}\n")
+        return
+    query_engine = _load_query_engine(index_dir)
+
+    async def query_all():
+        return await asyncio.gather(*[query_engine.aquery(queries[i]) for i in misses])
+
+    for i, response in zip(misses, asyncio.run(query_all())):
+        responses[i] = str(response)
+        cache.store(query_embeddings[i], responses[i])
+    for query, response in zip(queries, responses):
+        typer.echo(f"{query}:\n{response}\n")
+
+
+def _page_count(path: str) -> int:
+    """Return the number of pages in the PDF."""
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_sentences(path: str, pages: list[int]) -> list[str]:
+    """Return the candidate summary sentences of the given (1-based) pages of the PDF."""
+    import pdfplumber
+    # Each worker opens its own parser; pdfplumber page objects share parser state and are not thread safe
+    sentences = []
+    with pdfplumber.open(path, pages=pages) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text()
+            if text:
+                sentences.extend(SENTENCE_RE.findall(text))
+    return sentences
+
+
+def _top_k(scores: torch.Tensor, k: int) -> list[int]:
+    """Return the indices of the k highest scores in arbitrary order."""
+    import numpy as np
+    import torch
+    if len(scores) <= k:
+        return list(range(len(scores)))
+    if len(scores) > ARGPARTITION_THRESHOLD:
+        # Partial selection is O(N) and avoids the sort scratch buffer of topk on large score vectors
+        return np.argpartition(scores.float().cpu().numpy(), -k)[-k:].tolist()
+    return torch.topk(scores, k, sorted=False).indices.tolist()
+
+
+def _summarise(pdf_dir: str, model: SentenceTransformer | None = None):
+    import numpy as np
+    import torch
+    import torch.nn.functional as F
+    with os.scandir(pdf_dir) as entries:
+        paths = [entry.path for entry in entries if entry.is_file() and entry.name.lower().endswith('.pdf')]
+    # PDF parsing is CPU bound, so extract the files in parallel worker processes.
+    # Large PDFs are split into page ranges so their pages are spread over the workers as well.
+    sentences_by_path = {path: [] for path in paths}
+    # A loaded model means this process holds the torch and tokenizers thread pools and possibly a CUDA/MPS
+    # context, which forked workers must not inherit, so start the workers fresh
+    mp_context = multiprocessing.get_context('spawn') if model is not None else None
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=mp_context) as executor:
+        page_counts = executor.map(_page_count, paths, chunksize=4)
+        tasks = [(path, list(range(first, min(first + PAGES_PER_TASK, count + 1))))
+                 for path, count in zip(paths, page_counts) for first in range(1, count + 1, PAGES_PER_TASK)]
+        task_paths = [path for path, _ in tasks]
+        task_sentences = executor.map(_extract_sentences, task_paths, [pages for _, pages in tasks])
+        for path, sentences in zip(task_paths, task_sentences):
+            sentences_by_path[path].extend(sentences)
+    # Collect the candidate sentences of all PDFs first so they can be encoded in one batched call
+    filenames = []
+    sentences_per_doc = []
+    for path in paths:
+        filename = os.path.basename(path)
+        if sentences_by_path[path]:
+            filenames.append(filename)
+            sentences_per_doc.append(sentences_by_path[path])
+        else:
+            typer.echo(f"No text found in {filename}")
+    if not filenames:
+        return
+    if model is None:
+        # Load the model after the extraction so the worker processes do not inherit it
+        model = _load_model()
+    offsets = np.cumsum([0] + [len(sentences) for sentences in sentences_per_doc])
+    all_sentences = [s for sentences in sentences_per_doc for s in sentences]
+    with torch.inference_mode():
+        sent_embeddings = model.encode(all_sentences, batch_size=128, convert_to_tensor=True,
+                                       normalize_embeddings=True, show_progress_bar=True)
+    # The document embedding is the normalized mean of its sentence embeddings. Encoding the full text instead
+    # would only represent the first 512 tokens, as longer inputs are truncated by the model.
+    doc_embeddings = F.normalize(torch.stack([sent_embeddings[offsets[i]:offsets[i + 1]].mean(dim=0)
+                                              for i in range(len(filenames))]), dim=1)
+    # The scores are only used for ranking, so bf16 precision is sufficient and halves the memory traffic
+    sent_embeddings = sent_embeddings.to(torch.bfloat16)
+    doc_embeddings = doc_embeddings.to(torch.bfloat16)
+    for i, filename in enumerate(filenames):
+        sentences = sentences_per_doc[i]
+        # Simple summarization: extract top 5 sentences by semantic similarity to the document embedding
+        cos_scores = torch.mv(sent_embeddings[offsets[i]:offsets[i + 1]], doc_embeddings[i])
+        top_idx = _top_k(cos_scores, 5)
+        # List the selected sentences in document order
+        abstract = "\n".join([sentences[idx] for idx in sorted(top_idx)])
+        typer.echo(f"Abstract for {filename}:\n{abstract}\n")
 
 
 @app.command()
 def summarise(pdf_dir: str = PDF_DIR):
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    for filename in os.listdir(pdf_dir):
-        if filename.lower().endswith('.pdf'):
-            file_path = os.path.join(pdf_dir, filename)
-            with pdfplumber.open(file_path) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-            if text.strip():
-                # Simple summarization: extract top 5 sentences by semantic similarity to the document embedding
-                sentences = [s for s in text.split('\n') if len(s.split()) > 5]
-                doc_embedding = model.encode([text], convert_to_tensor=True)
-                sent_embeddings = model.encode(sentences, convert_to_tensor=True)
-                cos_scores = util.pytorch_cos_sim(doc_embedding, sent_embeddings)[0]
-                top_results = cos_scores.topk(5)
-                abstract = "\n".join([sentences[idx] for idx in top_results[1]])
-                typer.echo(f"Abstract for {filename}:\n{abstract}\n")
-            else:
-                typer.echo(f"No text found in {filename}")
+    _summarise(pdf_dir)
+
+
+@app.command()
+def serve(pdf_dir: str = PDF_DIR, index_dir: str = INDEX_DIR):
+    """Load the model and the index once and answer search and summarise commands until 'quit'."""
+    model = _load_model()
+    load_query_engine = functools.partial(_load_query_engine, index_dir)
+    load_query_engine()
+    cache = SemanticCache(index_dir, model=model)
+    typer.echo("Commands: 'search <query>', 'summarise [pdf_dir]', 'quit'")
+    while True:
+        command, _, argument = typer.prompt('>').strip().partition(' ')
+        if command == 'quit':
+            break
+        elif command == 'search' and argument:
+            typer.echo(_cached_query(argument, load_query_engine, cache))
+        elif command == 'summarise':
+            _summarise(argument or pdf_dir, model)
+        else:
+            typer.echo(f"Unknown command: {command} {argument}")
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
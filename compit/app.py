@@ -2,16 +2,9 @@ import typer
 from pathlib import Path
 from typing import Optional, List
 
-from openpyxl import Workbook
-from ocx_common.parser.xml_document_parser import LxmlParser
-from taxonomy.taxonomy import (visualize_clustered_taxonomy, visualize_taxonomy, visualize_with_plotly,
-                               ocx_coverage_report, create_coverage_chart_mpl, doc_coverage_report,)
-from taxonomy.mappings import end_to_end_coverage_report, model_coverage_report
-from taxonomy.load_taxonomy import load_taxonomy, print_taxonomy, load_multiple_graphs
-from taxonomy.validation import validate_taxonomy
-from taxonomy.taxonomy_common import RancDir, TaxonomyFields
-from taxonomy.ship_taxonomy import create_ship_pbs, write_excel
-from taxonomy.ocx_taxonomy import OcxTaxonomy
+# The taxonomy modules pull in pandas, lxml, graphviz, plotly and matplotlib. They are imported in the commands
+# using them to keep the CLI startup fast.
+from taxonomy.taxonomy_common import RancDir, ReportFormat, TaxonomyFields
 from loguru import logger
 from rich.table import Table
 from rich.console import Console
@@ -22,6 +15,20 @@ logger.add(sink=lambda msg: print(msg), level="DEBUG")
 
 logger.enable("taxonomy")
 
+CONSOLE = Console()
+# Column (name, style, justify) of the schema information table
+SCHEMA_TABLE_COLUMNS = (
+    ("Namespace", "cyan", "left"),
+    ("Version", "magenta", "left"),
+    ("Prefix", "green", "left"),
+    ("Elements", "blue", "right"),
+    ("Complex Types", "blue", "right"),
+    ("Simple Types", "blue", "right"),
+    ("Attr Groups", "blue", "right"),
+    ("Attributes", "blue", "right"),
+    ("Enums", "blue", "right"),
+)
+
 
 def rich_table(table:dict, title:str='Table')-> None:
     rich_table = Table(title=title)
@@ -34,20 +41,28 @@ def rich_table(table:dict, title:str='Table')-> None:
             rich_table.add_column(str(col), style="cyan", justify="right")
         else:
             rich_table.add_column(str(col), style="cyan", justify="left")
-    #Rows
+    # Rows. Only alphabetic text is padded, every other cell (numbers, None, mixed text) is shown with str
     for dim,data in table.items():
-        rich_table.add_row(*[str(f"{data[col]:>10}") if str(data[col]).isalpha() else str(f"{data[col]}") for col in headings ])
+        rich_table.add_row(*[f"{value:>10}" if isinstance(value, str) and value.isalpha() else str(value)
+                             for value in (data[col] for col in headings)])
     # Print table
-    console = Console()
-    console.print(rich_table)
+    CONSOLE.print(rich_table)
 def save_table_to_excel(table:dict, output_file:Path):
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Coverage Report"
-    # Write header
     dimensions = [key for key in table.keys()]
     headings = [*list(table.get(dimensions[0]).keys())]
+    if output_file.suffix == f'.{ReportFormat.PARQUET.value}':
+        # Columnar output is much faster to write for large reports
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pydict({col: [data[col] for data in table.values()] for col in headings}),
+                       str(output_file))
+        logger.info(f"Coverage report saved to {output_file}")
+        return
+    from openpyxl import Workbook
+    # Write-only workbooks stream the rows to disk instead of keeping every cell in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Coverage Report")
+    # Write header
     ws.append(headings)
     # Write data rows
     for dim, data in table.items():
@@ -66,15 +81,8 @@ def print_schema_table(schema_dict: dict) -> None:
     table = Table(title="Schema Information")
 
     # Add columns
-    table.add_column("Namespace", style="cyan")
-    table.add_column("Version", style="magenta")
-    table.add_column("Prefix", style="green")
-    table.add_column("Elements", justify="right", style="blue")
-    table.add_column("Complex Types", justify="right", style="blue")
-    table.add_column("Simple Types", justify="right", style="blue")
-    table.add_column("Attr Groups", justify="right", style="blue")
-    table.add_column("Attributes", justify="right", style="blue")
-    table.add_column("Enums", justify="right", style="blue")
+    for name, style, justify in SCHEMA_TABLE_COLUMNS:
+        table.add_column(name, style=style, justify=justify)
 
     # Add rows
     for namespace, data in schema_dict.items():
@@ -91,8 +99,7 @@ def print_schema_table(schema_dict: dict) -> None:
         )
 
     # Print table
-    console = Console()
-    console.print(table)
+    CONSOLE.print(table)
 
 app = typer.Typer()
 
@@ -109,6 +116,7 @@ def pbs(
     """
     Create the ship breakdown structure.
     """
+    from taxonomy.ship_taxonomy import create_ship_pbs, write_excel
     typer.echo(f"Creating shp product breakdown structure: {excel_file}")
 
     pbs = create_ship_pbs()
@@ -133,6 +141,7 @@ def validate(
     """
     Validate taxonomy Excel file for ID uniqueness, parent references, and cycles.
     """
+    from taxonomy.validation import validate_taxonomy
     typer.echo(f"Validating taxonomy file: {excel_file}")
 
     errors = validate_taxonomy(excel_file, sheet_name=sheet, spell_check=spell_check)
@@ -164,6 +173,7 @@ def ocx_graph(
     """
     Create a graph of the OCX schema and save it to Excel.
     """
+    from taxonomy.ocx_taxonomy import OcxTaxonomy
     typer.echo(f"Reading OCX schema from: {url}")
 
     try:
@@ -196,6 +206,7 @@ def tree(
     """
     Display the taxonomy hierarchy in a tree structure.
     """
+    from taxonomy.load_taxonomy import load_taxonomy, print_taxonomy
     typer.echo(f"Loading taxonomy from: {excel_file}")
 
     try:
@@ -240,6 +251,8 @@ def chart(
 
 ) -> None:
     """Generate a visual chart of the taxonomy hierarchy."""
+    from taxonomy.load_taxonomy import load_taxonomy
+    from taxonomy.taxonomy import visualize_taxonomy
     try:
         taxonomy = load_taxonomy(excel_path=excel_file, sheet_name=sheet, sub_graph=row_id, )
         typer.echo(f"✅ Taxonomy loaded successfully from {excel_file} (Sheet: {sheet})")
@@ -280,6 +293,8 @@ def cluster(
     sub_graphs: Optional[List[str]] = typer.Option(None, "--sub-graphs", "-sg", help="List of row IDs to visualize as sub-graphs"),
 ) -> None:
     """Generate clustered graphs from several Excel files."""
+    from taxonomy.load_taxonomy import load_multiple_graphs
+    from taxonomy.taxonomy import visualize_clustered_taxonomy
     try:
         graphs = load_multiple_graphs(files=excel_files, sub_graphs=sub_graphs,sheet_name=sheet,)
         typer.echo(f"✅ Taxonomy loaded successfully from {excel_files} (Sheet: {sheet})")
@@ -308,6 +323,8 @@ def plotly(
 
 ) -> None:
     """Generate interactive plotly charts from several Excel files."""
+    from taxonomy.load_taxonomy import load_multiple_graphs
+    from taxonomy.taxonomy import visualize_with_plotly
     try:
         graphs = load_multiple_graphs(files=excel_files)
         typer.echo(f"✅ Taxonomy loaded successfully from {excel_files}")
@@ -352,10 +369,15 @@ def ocx_coverage(
                                                   help="The title of the chart"),
 
         save_report: bool = typer.Option(True, "--save-report/--no-report", "-sr/-nr",
-                                         help="Save the coverage report to an Excel file")
+                                         help="Save the coverage report to an Excel file"),
+        report_format: ReportFormat = typer.Option(ReportFormat.XLSX, "--format",
+                                                  help="File format of the saved coverage report"),
 
 ) -> None:
     """Report mapping coverage."""
+    from taxonomy.load_taxonomy import load_taxonomy
+    from taxonomy.ocx_taxonomy import OcxTaxonomy
+    from taxonomy.taxonomy import ocx_coverage_report, create_coverage_chart_mpl
     try:
         graph = load_taxonomy(excel_path=source)
         typer.echo(f"✅ Taxonomy loaded successfully from {source}")
@@ -372,7 +394,7 @@ def ocx_coverage(
         create_coverage_chart_mpl(data=report, title=chart_title,output_file=output_file)
         typer.echo(f"✅ Coverage chart created successfully: {output_file}")
         if save_report:
-            excel_file = chart_folder / f"{chart_name}.xlsx"
+            excel_file = chart_folder / f"{chart_name}.{report_format.value}"
             save_table_to_excel(table=report, output_file=excel_file)
             typer.echo(f"✅ Coverage report saved to file: {excel_file}")
     except Exception as e:
@@ -409,9 +431,13 @@ def doc_coverage(
                                                 ]),
         save_report: bool = typer.Option(True, "--save-report/--no-report", "-sr/-nr",
                                      help="Save the coverage report to an Excel file"),
+        report_format: ReportFormat = typer.Option(ReportFormat.XLSX, "--format",
+                                                  help="File format of the saved coverage report"),
 
 ) -> None:
     """Report mapping coverage."""
+    from taxonomy.load_taxonomy import load_multiple_graphs
+    from taxonomy.taxonomy import doc_coverage_report, create_coverage_chart_mpl
     try:
         graphs = load_multiple_graphs(files=[source, target])
         typer.echo(f"✅ Taxonomy loaded successfully from {source}")
@@ -424,7 +450,7 @@ def doc_coverage(
         typer.echo(f"✅ Coverage chart created successfully:{output_file}.png")
         # Save the report to Excel
         if save_report:
-            excel_file = chart_folder / f"{chart_name}.xlsx"
+            excel_file = chart_folder / f"{chart_name}.{report_format.value}"
             save_table_to_excel(table=report, output_file=excel_file)
             typer.echo(f"✅ Coverage report saved to file: {excel_file}")
     except Exception as e:
@@ -471,10 +497,16 @@ def end_to_end_coverage(
         chart_title: Optional[str] = typer.Option(default='OCX protocol coverage per drawing',
                     help="The title of the chart"),
         save_report: bool = typer.Option(True, "--save-report/--no-report", "-sr/-nr",
-                                         help="Save the coverage report to an Excel file")
+                                         help="Save the coverage report to an Excel file"),
+        report_format: ReportFormat = typer.Option(ReportFormat.XLSX, "--format",
+                                                  help="File format of the saved coverage report"),
 
 ) -> None:
     """Report mapping coverage."""
+    from taxonomy.load_taxonomy import load_multiple_graphs
+    from taxonomy.ocx_taxonomy import OcxTaxonomy
+    from taxonomy.mappings import end_to_end_coverage_report
+    from taxonomy.taxonomy import create_coverage_chart_mpl
     try:
         graphs = load_multiple_graphs(files=[doc_req, taxonomy])
         typer.echo(f"✅ Taxonomy loaded successfully from {[doc_req, taxonomy]}")
@@ -491,7 +523,7 @@ def end_to_end_coverage(
         typer.echo(f"✅ Coverage chart created successfully: {output_file}")
         # Save the report to Excel
         if save_report:
-            excel_file = chart_folder / f"{chart_name}.xlsx"
+            excel_file = chart_folder / f"{chart_name}.{report_format.value}"
             save_table_to_excel(table=report, output_file=excel_file)
             typer.echo(f"✅ Coverage report saved to file: {excel_file}")
     except Exception as e:
@@ -534,10 +566,16 @@ def model_coverage(
     chart_title: Optional[str] = typer.Option(default='3D model coverage per drawing',
                                                   help="The title of the chart"),
     save_report: bool = typer.Option(True, "--save-report/--no-report", "-sr/-nr",
-                                         help="Save the coverage report to an Excel file")
+                                         help="Save the coverage report to an Excel file"),
+    report_format: ReportFormat = typer.Option(ReportFormat.XLSX, "--format",
+                                              help="File format of the saved coverage report"),
 
 ) -> None:
     """3D model DoCReq coverage."""
+    from ocx_common.parser.xml_document_parser import LxmlParser
+    from taxonomy.load_taxonomy import load_multiple_graphs
+    from taxonomy.mappings import model_coverage_report
+    from taxonomy.taxonomy import create_coverage_chart_mpl
     try:
         graphs = load_multiple_graphs(files=[doc_req, taxonomy])
         typer.echo(f"✅ Taxonomy loaded successfully from {[doc_req, taxonomy]}")
@@ -551,7 +589,7 @@ def model_coverage(
         create_coverage_chart_mpl(data=report, axis_label="Title", title=chart_title,output_file=str(output_file))
         typer.echo(f"✅ Coverage chart created successfully: {output_file}")
         if save_report:
-            excel_file = chart_folder / f"{chart_name}.xlsx"
+            excel_file = chart_folder / f"{chart_name}.{report_format.value}"
             save_table_to_excel(table=report, output_file=excel_file)
             typer.echo(f"✅ Coverage report saved to file: {excel_file}")
     except Exception as e:
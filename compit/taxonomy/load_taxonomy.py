@@ -1,14 +1,18 @@
 """Module to load taxonomy data into the database."""
 import logging
-from typing import List
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import List, Union
 from pathlib import Path
 
 import pandas as pd
+from openpyxl import Workbook, load_workbook
 from rich.console import Console
 from rich.tree import Tree
 
-from taxonomy.ocx_taxonomy import OcxTaxonomy
-from taxonomy.taxonomy_common import AttributeFields, TaxonomyFields
+from taxonomy.taxonomy_common import AttributeFields, TaxonomyFields, disk_cache
 
 
 def get_excel_cell_ref(row_num, col_name):
@@ -16,31 +20,61 @@ def get_excel_cell_ref(row_num, col_name):
     return f"{col_name}:{row_num}"
 
 
-def get_children(taxonomy, parent_id):
+def build_child_index(taxonomy: dict) -> dict:
     """
-    Get all children of a given parent ID in the taxonomy.
+    Build a dictionary of the children IDs of each parent ID with a single pass over the taxonomy.
     """
-    children = []
+    child_index = {}
     for child_id, data in taxonomy.items():
-        if data["parent"] == parent_id:
-            children.append(child_id)
-    return children
+        child_index.setdefault(data[TaxonomyFields.PARENT_ID.value], []).append(child_id)
+    return child_index
+
+
+def get_children(taxonomy, parent_id, child_index: dict = None):
+    """
+    Get all children of a given parent ID in the taxonomy.
+    Pass the index from build_child_index to avoid scanning the full taxonomy on repeated calls.
+    """
+    if child_index is None:
+        child_index = build_child_index(taxonomy)
+    return child_index.get(parent_id, [])
+
 
+def open_excel(excel_path: Path) -> pd.ExcelFile:
+    """Open an Excel file with the Rust based calamine engine if installed, otherwise with openpyxl."""
+    try:
+        return pd.ExcelFile(excel_path, engine='calamine')
+    except ImportError:
+        return pd.ExcelFile(excel_path, engine='openpyxl')
 
-def load_taxonomy_attributes(excel_path: Path, sheet_name: str = 'attributes') -> dict:
+
+def get_records(df: pd.DataFrame, fields: List[str], raw_fields: tuple = ()) -> List[dict]:
+    """
+    Return the rows of the given columns as dictionaries of stripped strings, with missing values as None.
+    Columns in raw_fields keep their original values.
+    """
+    columns = {field: df[field] if field in raw_fields else df[field].astype('string').str.strip()
+               for field in fields}
+    df = pd.DataFrame(columns).astype(object)
+    return df.where(df.notna(), None).to_dict(orient='records')
+
+
+def load_taxonomy_attributes(excel_path: Union[Path, pd.ExcelFile], sheet_name: str = 'attributes') -> dict:
     """
     Load attributes from Excel sheet and store them in a dictionary by taxonomy ID.
     Each taxonomy ID contains a list of attribute dictionaries with their properties.
 
     Args:
-        excel_path (Path): Path to Excel file
+        excel_path (Path | pd.ExcelFile): Path to Excel file or an already opened Excel file
         sheet_name (str): Name of sheet containing attributes
 
     Returns:
         dict: Dictionary of attributes by taxonomy ID
     """
     # Read the attributes sheet
-    df_attributes = pd.read_excel(excel_path, sheet_name='attributes')
+    if not isinstance(excel_path, pd.ExcelFile):
+        excel_path = open_excel(excel_path)
+    df_attributes = pd.read_excel(excel_path, sheet_name=sheet_name)
 
     # Check required columns
     required_fields = [field.value for field in AttributeFields]
@@ -54,20 +88,20 @@ def load_taxonomy_attributes(excel_path: Path, sheet_name: str = 'attributes') -
 
     # Create attributes dictionary by node ID
     attributes_by_id = {}
+    # Resolve the field keys once outside the row loop
+    id_key = AttributeFields.ID.value
+    required_key = AttributeFields.REQUIRED.value
+    name_key = AttributeFields.ATTRIBUTE_NAME.value
 
-    for _, row in df_attributes.iterrows():
-        node_id = str(row[AttributeFields.ID.value]).strip()
+    for row in get_records(df_attributes, required_fields, raw_fields=(required_key,)):
+        node_id = str(row[id_key])
 
         # Create attribute dictionary with all fields
-        attribute_dict = {
-            field.value: str(row[field.value]).strip() if pd.notna(row[field.value]) else None
-            for field in AttributeFields
-        }
-        attribute_dict['required'] = bool(row[AttributeFields.REQUIRED.value]) if (
-            pd.notna(row[AttributeFields.REQUIRED.value])) else False
+        attribute_dict = row
+        attribute_dict[required_key] = bool(row[required_key]) if row[required_key] is not None else False
 
         # Skip if attribute name is None
-        if attribute_dict['attribute_name'] is None:
+        if attribute_dict[name_key] is None:
             continue
 
         # Initialize list for taxonomy ID if not exists
@@ -75,11 +109,12 @@ def load_taxonomy_attributes(excel_path: Path, sheet_name: str = 'attributes') -
             attributes_by_id[node_id] = {}
 
         # Store attribute using attribute name as key
-        attributes_by_id[node_id][attribute_dict['attribute_name']] = attribute_dict
+        attributes_by_id[node_id][attribute_dict[name_key]] = attribute_dict
 
     return attributes_by_id
 
 
+@disk_cache()
 def load_taxonomy(excel_path: Path, sheet_name: str = 'taxonomy', sub_graph: str = None) -> dict:
     """
     Load taxonomy from an Excel file including document type, description, rule reference and attributes information.
@@ -93,20 +128,20 @@ def load_taxonomy(excel_path: Path, sheet_name: str = 'taxonomy', sub_graph: str
         dict: Filtered taxonomy dictionary
     """
     try:
-        # Read the taxonomy sheet
-        df_taxonomy = pd.read_excel(excel_path, sheet_name=sheet_name)
-        # Read attributes sheet
-        attributes_by_id = load_taxonomy_attributes(excel_path, sheet_name='attributes')
+        # Open the workbook once for both sheets
+        with open_excel(excel_path) as excel_file:
+            # Read the taxonomy sheet
+            df_taxonomy = pd.read_excel(excel_file, sheet_name=sheet_name)
+            # Read attributes sheet
+            attributes_by_id = load_taxonomy_attributes(excel_file, sheet_name='attributes')
 
         # Convert taxonomy DataFrame to dictionary format
         full_taxonomy = {}
-        for _, row in df_taxonomy.iterrows():
+        id_key = TaxonomyFields.ID.value
+        for row in get_records(df_taxonomy, [field.value for field in TaxonomyFields]):
             # Create the taxonomy dict with all fields
-            taxonomy_dict = {
-                field.value: str(row[field.value]).strip() if pd.notna(row[field.value]) else None
-                for field in TaxonomyFields
-            }
-            row_id = str(row[TaxonomyFields.ID.value]).strip()
+            taxonomy_dict = row
+            row_id = str(row[id_key])
             taxonomy_dict['attributes'] = attributes_by_id.get(row_id, {})  # Add attributes, empty dict if none found
             full_taxonomy[row_id] = taxonomy_dict
 
@@ -117,21 +152,21 @@ def load_taxonomy(excel_path: Path, sheet_name: str = 'taxonomy', sub_graph: str
         filtered_taxonomy = {}
 
         def add_parents(node_id):
-            """Add all parent nodes recursively"""
-            node = full_taxonomy.get(node_id)
-            if node and node[TaxonomyFields.PARENT_ID.value]:
-                parent_id = node[TaxonomyFields.PARENT_ID.value]
-                if parent_id not in filtered_taxonomy and parent_id in full_taxonomy:
-                    filtered_taxonomy[parent_id] = full_taxonomy[parent_id]
-                    add_parents(parent_id)
+            """Add all parent nodes up to the root"""
+            parent_id = full_taxonomy[node_id][TaxonomyFields.PARENT_ID.value]
+            while parent_id and parent_id not in filtered_taxonomy and parent_id in full_taxonomy:
+                filtered_taxonomy[parent_id] = full_taxonomy[parent_id]
+                parent_id = full_taxonomy[parent_id][TaxonomyFields.PARENT_ID.value]
 
         def add_children(node_id):
-            """Add all child nodes recursively"""
-            for child_id, data in full_taxonomy.items():
-                if data[TaxonomyFields.PARENT_ID.value] == node_id:
+            """Add all descendant nodes"""
+            child_index = build_child_index(full_taxonomy)
+            stack = [node_id]
+            while stack:
+                for child_id in child_index.get(stack.pop(), []):
                     if child_id not in filtered_taxonomy:
-                        filtered_taxonomy[child_id] = data
-                        add_children(child_id)
+                        filtered_taxonomy[child_id] = full_taxonomy[child_id]
+                        stack.append(child_id)
 
         # Add the filtered node itself
         if sub_graph in full_taxonomy:
@@ -156,9 +191,10 @@ def expand_nodes(taxonomy: dict, node_ids: list) -> None:
         taxonomy (dict): The taxonomy dictionary to expand
         node_ids (list): List of node IDs to expand
     """
+    child_index = build_child_index(taxonomy)
     for taxonomy_id in node_ids:
         if taxonomy_id in taxonomy:
-            children = get_children(taxonomy, taxonomy_id)
+            children = get_children(taxonomy, taxonomy_id, child_index)
             for child_id in children:
                 if child_id not in taxonomy:
                     # Add child node with empty fields if not already present
@@ -184,48 +220,55 @@ def serialize_taxonomy(taxonomy: dict, excel_path: Path, sheet_name: str = 'taxo
     """
     Serialize the taxonomy dictionary back to an Excel file.
     """
-    # Convert taxonomy dictionary to list of rows
-    rows = []
+    # Append the sheet to an existing workbook, otherwise stream the rows into a write-only workbook
+    workbook = load_workbook(excel_path) if excel_path.exists() else Workbook(write_only=True)
+    if sheet_name in workbook.sheetnames:
+        raise ValueError(f"Sheet '{sheet_name}' already exists in {excel_path}")
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append([field.value for field in (TaxonomyFields.ID, TaxonomyFields.PARENT_ID, TaxonomyFields.LABEL,
+                                            TaxonomyFields.REFERENCE, TaxonomyFields.DESCRIPTION,
+                                            TaxonomyFields.MAPPING)])
+    # Fetch the row values in header order with one call per node
+    row_values = itemgetter("parent", "label", "reference", "description", "mapping")
     for node_id, data in taxonomy.items():
-        row = {
-            TaxonomyFields.ID.value: node_id,
-            TaxonomyFields.PARENT_ID.value: data["parent"],
-            TaxonomyFields.LABEL.value: data["label"],
-            TaxonomyFields.REFERENCE.value: data["reference"],
-            TaxonomyFields.DESCRIPTION.value: data["description"],
-            TaxonomyFields.MAPPING.value: data["mapping"]
-        }
-        rows.append(row)
-
-    # Create DataFrame from rows
-    df = pd.DataFrame(rows)
+        sheet.append((node_id, *row_values(data)))
+    workbook.save(excel_path)
 
-    # Write DataFrame to Excel
-    with pd.ExcelWriter(excel_path, engine='openpyxl', mode='a' if excel_path.exists() else 'w') as writer:
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
 
-
-def print_taxonomy(taxonomy, parent_id=None, tree=None, doc_type_filter=None, max_depth=None, current_depth=0):
+def print_taxonomy(taxonomy, parent_id=None, tree=None, doc_type_filter=None, max_depth=None, current_depth=0,
+                   child_index=None, match_depth=None):
     """
     Print the taxonomy using Rich's Tree visualization with optional doc_type filtering and depth limit.
     """
     console = Console()
+    if child_index is None:
+        child_index = build_child_index(taxonomy)
 
     def should_include_node(node_id):
         return (doc_type_filter is None or
                 taxonomy[node_id]["doc_type"] == doc_type_filter)
 
+    if match_depth is None:
+        # Distance from each node down to its nearest matching descendant (0 for a matching node), found with a
+        # breadth first walk up the parent links from all matching nodes. Nodes are visited once, so parent
+        # cycles terminate
+        match_depth = {node_id: 0 for node_id in taxonomy if should_include_node(node_id)}
+        queue = deque(match_depth)
+        while queue:
+            node_id = queue.popleft()
+            parent_id = taxonomy[node_id][TaxonomyFields.PARENT_ID.value]
+            if parent_id in taxonomy and parent_id not in match_depth:
+                match_depth[parent_id] = match_depth[node_id] + 1
+                queue.append(parent_id)
+
     def has_matching_descendants(node_id, depth=0):
-        if max_depth is not None and depth >= max_depth:
-            return False
-        if should_include_node(node_id):
-            return True
-        children = get_children(taxonomy, node_id)
-        return any(has_matching_descendants(child, depth + 1) for child in children)
+        # A match only counts if it lies above max_depth
+        distance = match_depth.get(node_id)
+        return distance is not None and (max_depth is None or depth + distance < max_depth)
 
     if tree is None:
-        root_nodes = [node_id for node_id, data in taxonomy.items()
-                      if data["parent"] is None and has_matching_descendants(node_id)]
+        root_nodes = [node_id for node_id in get_children(taxonomy, None, child_index)
+                      if has_matching_descendants(node_id)]
         if not root_nodes:
             console.print("❌ No matching nodes found in taxonomy")
             return
@@ -234,21 +277,23 @@ def print_taxonomy(taxonomy, parent_id=None, tree=None, doc_type_filter=None, ma
         for root in sorted(root_nodes):
             if has_matching_descendants(root):
                 node_tree = main_tree.add(f"[blue]{root}[/blue]: {taxonomy[root]['label']}")
-                print_taxonomy(taxonomy, root, node_tree, doc_type_filter, max_depth, 1)
+                print_taxonomy(taxonomy, root, node_tree, doc_type_filter, max_depth, 1, child_index, match_depth)
         console.print(main_tree)
         return
 
     if max_depth is not None and current_depth > max_depth:
         return
 
-    children = get_children(taxonomy, parent_id)
+    children = get_children(taxonomy, parent_id, child_index)
     for child in sorted(children):
         if has_matching_descendants(child, current_depth):
             if should_include_node(child):
                 child_tree = tree.add(f"[blue]{child}[/blue]: {taxonomy[child]['label']}")
-                print_taxonomy(taxonomy, child, child_tree, doc_type_filter, max_depth, current_depth + 1)
+                print_taxonomy(taxonomy, child, child_tree, doc_type_filter, max_depth, current_depth + 1,
+                               child_index, match_depth)
             else:
-                print_taxonomy(taxonomy, child, tree, doc_type_filter, max_depth, current_depth + 1)
+                print_taxonomy(taxonomy, child, tree, doc_type_filter, max_depth, current_depth + 1,
+                               child_index, match_depth)
 
 def load_multiple_graphs(files: List[Path], sub_graphs:List[str]= None, sheet_name: str = 'taxonomy') -> list:
     """
@@ -262,13 +307,22 @@ def load_multiple_graphs(files: List[Path], sub_graphs:List[str]= None, sheet_na
     Returns:
         list: List of taxonomy dictionaries
     """
-    graphs = []
-    for i, path in enumerate(files):
-        if sub_graphs is not None:
-            sub_graph = sub_graphs[i] if i < len(sub_graphs) else None
-        else:
-            sub_graph = None
-        graph = load_taxonomy(path, sheet_name=sheet_name, sub_graph=sub_graph )
-        graphs.append(graph)
-
-    return graphs
\ No newline at end of file
+    sub_graph_ids = [sub_graphs[i] if sub_graphs is not None and i < len(sub_graphs) else None
+                     for i in range(len(files))]
+    # Only workbooks missing from the disk cache are worth parsing in a worker process, each one once
+    calls = list(zip(files, sub_graph_ids))
+    misses = [i for i, call in enumerate(calls)
+              if call not in calls[:i] and not load_taxonomy.is_cached(call[0], sheet_name, call[1])]
+    graphs = [None] * len(files)
+    if len(misses) >= 2:
+        # Parse the missing workbooks in parallel, map keeps the order of the files
+        with ProcessPoolExecutor(max_workers=min(len(misses), os.cpu_count() or 1)) as executor:
+            parsed = executor.map(load_taxonomy, [files[i] for i in misses], [sheet_name] * len(misses),
+                                  [sub_graph_ids[i] for i in misses])
+            for i, graph in zip(misses, parsed):
+                graphs[i] = graph
+    # The cached workbooks, and repeated ones, are loaded in process
+    for i, (path, sub_graph) in enumerate(calls):
+        if graphs[i] is None:
+            graphs[i] = load_taxonomy(path, sheet_name=sheet_name, sub_graph=sub_graph)
+    return graphs
@@ -1,12 +1,14 @@
 """Module for generating coverage reports between document requirements, taxonomy, and OCX schema."""
+import functools
 import re
-from taxonomy.taxonomy_common import TaxonomyFields
+from taxonomy.taxonomy_common import MappingKind, TaxonomyFields
+from taxonomy.load_taxonomy import build_child_index
 from ocx_schema_parser.transformer import Transformer
 from ocx_schema_parser.xelement import LxmlElement
 from ocx_common.parser.xml_document_parser import LxmlParser
 from lxml.etree import Element
 from typing import List, Tuple, Union
-from taxonomy.taxonomy import doc_coverage_report
+from taxonomy.taxonomy import doc_coverage_report, get_descendants
 from ocx_common.x_path.x_path import OcxPathBuilder, OcxPath
 from ocx_common.ocx_query.query import OcxQuery
 from lxml import etree
@@ -14,14 +16,44 @@ from loguru import logger
 from ocx_common.lxml_wrapper.xelement import XsdElement
 
 
-def get_all_descendants(node_id: str, doc_req: dict) -> List[str]:
-    """Get all descendants of a node recursively"""
-    descendants = []
-    for child_id, data in doc_req.items():
-        if data.get(TaxonomyFields.PARENT_ID.value) == node_id:
-            descendants.append(child_id)
-            descendants.extend(get_all_descendants(child_id, doc_req))
-    return descendants
+def get_all_descendants(node_id: str, doc_req: dict, child_index: dict = None) -> List[str]:
+    """Get all descendants of a node in depth-first order using the child index from build_child_index"""
+    if child_index is None:
+        child_index = build_child_index(doc_req)
+    return get_descendants(node_id, child_index)
+
+
+@functools.lru_cache(maxsize=None)
+def parse_ocx_mapping(ocx_mapping: str, ns_items: frozenset) -> Tuple[MappingKind, str, str, str, tuple]:
+    """
+    Parse an OCX mapping into its kind, the Clark-notation tag of the element, the enumeration type and value,
+    and the Clark-notation tags of the substitution group members.
+    The result is cached since many taxonomy nodes share the same mapping.
+
+    Args:
+        ocx_mapping: The mapping, i.e. ``prefix:Element``, ``prefix:Element@enumType#value``
+            or ``prefix:Element=[prefix:Sub1, prefix:Sub2]``
+        ns_items: The namespace prefix and URI pairs as a frozenset so the arguments are hashable
+    """
+    # The braced namespace URI by prefix, so a Clark tag is a single concatenation
+    ns_braces = {prefix: '{' + uri + '}' for prefix, uri in ns_items}
+
+    def clark_tag(name: str) -> str:
+        # Names without a prefix are returned as is
+        if ':' not in name:
+            return name
+        prefix, local_name = name.split(':')[:2]
+        return ns_braces.get(prefix, '{}') + local_name
+
+    if '@' in ocx_mapping and '=' not in ocx_mapping:
+        element_name, enum_part = ocx_mapping.split('@')[:2]
+        enum_type, separator, enum_value = enum_part.partition('#')
+        return MappingKind.ENUMERATION, clark_tag(element_name), enum_type, enum_value if separator else None, ()
+    if '=' in ocx_mapping and '[' in ocx_mapping:
+        base_element, substitutes = ocx_mapping.split('=')[:2]
+        substitute_tags = tuple(clark_tag(s.strip()) for s in substitutes.strip('[]').split(','))
+        return MappingKind.SUBSTITUTION, clark_tag(base_element), None, None, substitute_tags
+    return MappingKind.ELEMENT, clark_tag(ocx_mapping), None, None, ()
 
 
 def end_to_end_coverage_report(doc_req: dict, taxonomy: dict, ocx_schema: Transformer, dimensions: List[str]) \
@@ -30,13 +62,40 @@ def end_to_end_coverage_report(doc_req: dict, taxonomy: dict, ocx_schema: Transf
     report = {}
     total_items = 0
     total_mapped = 0
+    child_index = build_child_index(doc_req)
+
+    # Schema lookups are invariant across the nodes
+    ns = ocx_schema.parser.get_namespaces()
+    ocx_elements = ocx_schema.parser.get_lookup_table()
+    enumerations = ocx_schema.get_enumerators()
+    enum_value_sets = {name: set(enum.to_dict().get('Value', [])) for name, enum in enumerations.items()}
+    ns_items = frozenset(ns.items())
+    # Validity by OCX mapping, each mapping is validated once for all nodes sharing it
+    validity_cache = {}
+
+    def is_valid_mapping(ocx_mapping: str) -> bool:
+        kind, ocx_tag, enum_type, enum_value, substitute_tags = parse_ocx_mapping(ocx_mapping, ns_items)
+        is_valid = False
+        if kind is MappingKind.ENUMERATION:
+            # Handle enumeration mapping
+            is_valid = ocx_tag in ocx_elements and enum_value in enum_value_sets.get(enum_type, ())
+        elif kind is MappingKind.SUBSTITUTION:
+            # Handle substitution groups, valid if any of the substitutes is in the schema
+            for substitute_tag in substitute_tags:
+                if '}' not in substitute_tag:
+                    logger.error(f"Invalid substitute format (missing prefix): {substitute_tag}")
+            is_valid = any(tag in ocx_elements for tag in substitute_tags if '}' in tag)
+        else:
+            # Handle regular element mapping
+            is_valid = ocx_tag in ocx_elements
+        return is_valid
 
     for dim in dimensions:
         mapped_items = []
         not_mapped_items = []
 
         # Get all descendants under this dimension
-        descendants = get_all_descendants(dim, doc_req)
+        descendants = get_all_descendants(dim, doc_req, child_index)
 
         # Analyze mapping chain for each descendant
         for node_id in descendants:
@@ -49,41 +108,9 @@ def end_to_end_coverage_report(doc_req: dict, taxonomy: dict, ocx_schema: Transf
 
                 if ocx_mapping:
                     # Check OCX mapping validity
-                    ns = ocx_schema.parser.get_namespaces()
-                    ocx_elements = ocx_schema.parser.get_lookup_table()
-                    enumerations = ocx_schema.get_enumerators()
-
-                    is_valid = False
-                    if '@' in ocx_mapping and not "=" in ocx_mapping:
-                        # Handle enumeration mapping
-                        ocx_tag = ocx_mapping.split('@')[0]
-                        ocx_tag = '{' + f'{ns.get(ocx_tag.split(":")[0], "")}' + '}' + f'{ocx_tag.split(":")[1]}'
-                        enum_type = (ocx_mapping.split('@')[1].split('#')[0], ocx_mapping.split('#')[1])
-
-                        is_valid = (ocx_tag in ocx_elements and
-                                    enum_type[0] in enumerations and
-                                    enum_type[1] in enumerations[enum_type[0]].to_dict().get('Value', []))
-                    elif '=' in ocx_mapping and '[' in ocx_mapping:
-                        # Handle substitution groups
-                        base_element, substitutes = ocx_mapping.split('=')
-                        # Clean up the substitutes string and split into list
-                        substitutes = substitutes.strip('[]').split(',')
-                        substitutes = [s.strip() for s in substitutes]
-                        # Check for all substitutes
-                        for substitute in substitutes:
-                            if not ':' in substitute:
-                                logger.error(f"Invalid substitute format (missing prefix): {substitute}")
-                                continue
-                            ocx_tag = '{' + f'{ns.get(substitute.split(":")[0], "")}' + '}' + f'{substitute.split(":")[1]}'
-                            is_valid = ocx_tag in ocx_elements
-                        if is_valid:
-                            mapped_items.append((node_id, tax_mapping, ocx_mapping))
-                        else:
-                            not_mapped_items.append((node_id, tax_mapping, "Invalid OCX mapping"))
-                    else:
-                        # Handle regular element mapping
-                        ocx_tag = '{' + f'{ns.get(ocx_mapping.split(":")[0], "")}' + '}' + f'{ocx_mapping.split(":")[1]}'
-                        is_valid = ocx_tag in ocx_elements
+                    is_valid = validity_cache.get(ocx_mapping)
+                    if is_valid is None:
+                        is_valid = validity_cache[ocx_mapping] = is_valid_mapping(ocx_mapping)
 
                     if is_valid:
                         mapped_items.append((node_id, tax_mapping, ocx_mapping))
@@ -99,9 +126,9 @@ def end_to_end_coverage_report(doc_req: dict, taxonomy: dict, ocx_schema: Transf
         coverage = (len(mapped_items) / total * 100) if total > 0 else 0.0
 
         # Format not_mapped_items as string
-        not_mapped_details = ""
-        for item in not_mapped_items:
-            not_mapped_details += f"{item[0]}:{doc_req[item[0]].get(TaxonomyFields.LABEL.value)} ({item[1]} -> {item[2]}), "
+        not_mapped_details = ", ".join(
+            f"{node}:{doc_req[node].get(TaxonomyFields.LABEL.value)} ({tax_mapping} -> {reason})"
+            for node, tax_mapping, reason in not_mapped_items)
 
         report[dim] = {
             "Dimension": f'{dim}:{doc_req[dim][TaxonomyFields.LABEL.value]}',
@@ -136,11 +163,34 @@ def model_coverage_report(doc_req: dict, taxonomy: dict, parser: LxmlParser, dim
         # Get the root element and namespaces once
         root = parser.get_root()
         ns = parser.get_namespaces()
+        ns_items = frozenset(ns.items())
+        child_index = build_child_index(doc_req)
+        # Compiled XPath expressions by expression string
+        xpath_cache = {}
+        # Existence check results by OCX mapping
+        validity_cache = {}
+
+        def find(xpath: str) -> list:
+            compiled = xpath_cache.get(xpath)
+            if compiled is None:
+                compiled = xpath_cache[xpath] = etree.XPath(xpath, namespaces=ns)
+            return compiled(root)
+
+        # Collect the element local names and the attribute values by element and attribute local name in one pass
+        present = set()
+        attr_vals = {}
+        for element in root.iter():
+            if not isinstance(element.tag, str):
+                continue  # Comments and processing instructions
+            element_name = element.tag.rpartition('}')[2]
+            present.add(element_name)
+            for key, value in element.attrib.items():
+                attr_vals.setdefault((element_name, key.rpartition('}')[2]), set()).add(value)
 
         for dim in dimensions:
             mapped_items = []
             not_mapped_items = []
-            descendants = get_all_descendants(dim, doc_req)
+            descendants = get_all_descendants(dim, doc_req, child_index)
 
             for node_id in descendants:
                 data = doc_req[node_id]
@@ -152,66 +202,52 @@ def model_coverage_report(doc_req: dict, taxonomy: dict, parser: LxmlParser, dim
 
                     if ocx_mapping:
 
-                        try:
-                            is_valid = False
-                            if '@' in ocx_mapping and not "=" in ocx_mapping:
-                                # Handle enumeration value mapping (element@enumType#value)
-                                element_name, enum_part = ocx_mapping.split('@')
-                                prefix, local_name = element_name.split(':')
-                                namespace = ns.get(prefix, '')  # Get the namespace for the prefix
-
-                                # Check enumeration value if specified
-                                if '#' in enum_part:
-                                    enum_type, enum_value = enum_part.split('#')
-                                    # Use both namespace prefix and local-name in the query
-                                    # Check for enum sub-type
-                                    if ':' in enum_type:
-                                        enum_value, enum_sub = enum_type.split(':')
-                                        # Remove whitespace in enum_sub using regex
-                                        enum_sub = re.sub(r'\s+', '', enum_sub)
-                                        xpath = f"//*[local-name()='{local_name}' and @*[local-name()='{enum_type}'{enum_value}: {enum_sub}']" # Ensure one whitespace before the enum_sub
-                                        is_valid = len(root.xpath(xpath, namespaces=ns)) > 0
-                                    else:
-                                        xpath = f"//*[local-name()='{local_name}' and @*[local-name()='{enum_type}']='{enum_value}']"
-                                        elements = root.xpath(xpath, namespaces=ns)
-                                        is_valid = len(elements) > 0
-                                        if not is_valid:
-                                            logger.debug(f"No elements found for {ocx_mapping} using xpath: {xpath}")
-                            elif '=' in ocx_mapping and '[' in ocx_mapping:
-                                # Handle substitution groups
-                                base_element, substitutes = ocx_mapping.split('=')
-                                # Clean up the substitutes string and split into list
-                                substitutes = substitutes.strip('[]').split(',')
-                                substitutes = [s.strip() for s in substitutes]
-
-                                # Build XPath to find any element that matches one of the substitutes
-                                local_names = []
-                                for substitute in substitutes:
-                                    if ':' in substitute:
-                                        prefix, local_name = substitute.split(':')
-                                        local_names.append(local_name)
+                        kind, ocx_tag, enum_type, enum_value, substitute_tags = parse_ocx_mapping(ocx_mapping, ns_items)
+                        # Substitution groups with the same members share a cache entry regardless of their order
+                        if kind is MappingKind.SUBSTITUTION:
+                            cache_key = tuple(sorted(tag.rpartition('}')[2] for tag in substitute_tags))
+                        else:
+                            cache_key = ocx_mapping
+                        is_valid = validity_cache.get(cache_key)
+                        if is_valid is None:
+                            try:
+                                local_name = ocx_tag.rpartition('}')[2]
+                                is_valid = False
+                                if kind is MappingKind.ENUMERATION:
+                                    # Handle enumeration value mapping (element@enumType#value)
+                                    # Check enumeration value if specified
+                                    if enum_value is not None:
+                                        # Use both namespace prefix and local-name in the query
+                                        # Check for enum sub-type
+                                        if ':' in enum_type:
+                                            enum_value, enum_sub = enum_type.split(':')
+                                            # Remove whitespace in enum_sub using regex
+                                            enum_sub = re.sub(r'\s+', '', enum_sub)
+                                            xpath = f"//*[local-name()='{local_name}' and @*[local-name()='{enum_type}'{enum_value}: {enum_sub}']" # Ensure one whitespace before the enum_sub
+                                            is_valid = len(find(xpath)) > 0
+                                        else:
+                                            is_valid = enum_value in attr_vals.get((local_name, enum_type), ())
+                                            if not is_valid:
+                                                logger.debug(f"No {local_name} elements found for {ocx_mapping}")
+                                elif kind is MappingKind.SUBSTITUTION:
+                                    # Handle substitution groups
+                                    # Check for any element that matches one of the substitutes
+                                    local_names = [tag.rpartition('}')[2] for tag in substitute_tags]
+
+                                    if local_names:
+                                        is_valid = any(name in present for name in local_names)
                                     else:
-                                        local_names.append(substitute)
+                                        is_valid = False
+                                        logger.error(f"No valid element names found in substitution group: {ocx_mapping}")
 
-                                if local_names:
-                                    # Create XPath condition to match any of the local names
-                                    name_conditions = " or ".join([f"local-name()='{name}'" for name in local_names])
-                                    xpath = f"//*[{name_conditions}]"
-                                    is_valid = len(root.xpath(xpath, namespaces=ns)) > 0
                                 else:
-                                    is_valid = False
-                                    logger.error(f"No valid element names found in substitution group: {ocx_mapping}")
-
-                            else:
-                                # Handle simple element mapping
-                                prefix, local_name = ocx_mapping.split(':')
-                                namespace = ns.get(prefix, '')
-                                xpath = f"//*[local-name()='{local_name}']"
-                                is_valid = len(root.xpath(xpath, namespaces=ns)) > 0
+                                    # Handle simple element mapping
+                                    is_valid = local_name in present
 
-                        except Exception as e:
-                            logger.error(f"Error checking mapping {ocx_mapping}: {str(e)}")
-                            is_valid = False
+                            except Exception as e:
+                                logger.error(f"Error checking mapping {ocx_mapping}: {str(e)}")
+                                is_valid = False
+                            validity_cache[cache_key] = is_valid
 
                         if is_valid:
                             mapped_items.append((node_id, tax_mapping, ocx_mapping))
@@ -226,9 +262,9 @@ def model_coverage_report(doc_req: dict, taxonomy: dict, parser: LxmlParser, dim
             total = len(mapped_items) + len(not_mapped_items)
             coverage = (len(mapped_items) / total * 100) if total > 0 else 0.0
 
-            not_mapped_details = ""
-            for item in not_mapped_items:
-                not_mapped_details += f"{item[0]}:{doc_req[item[0]].get(TaxonomyFields.LABEL.value)} ({item[1]} -> {item[2]}), "
+            not_mapped_details = ", ".join(
+                f"{node}:{doc_req[node].get(TaxonomyFields.LABEL.value)} ({tax_mapping} -> {reason})"
+                for node, tax_mapping, reason in not_mapped_items)
 
             report[dim] = {
                 "Dimension": dim,
@@ -1,5 +1,14 @@
 """Module to handle OCX taxonomy generation and manipulation."""
-from typing import Union, Iterator
+import hashlib
+import itertools
+import queue
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Iterator, Iterable, List, Tuple
+from xml.sax.saxutils import escape, quoteattr
 from ocx_schema_parser.transformer import Transformer
 from ocx_schema_parser.elements import OcxGlobalElement, OcxSchemaChild, OcxSchemaAttribute
 from pathlib import Path
@@ -10,22 +19,259 @@ from taxonomy.taxonomy_common import ExcludeNodes, camel_to_snake, AttributeFiel
 
 logger.enable('ocx_schema_parser')
 
+# Field keys resolved once for the per-node hot path
+_ID = TaxonomyFields.ID.value
+_PARENT_ID = TaxonomyFields.PARENT_ID.value
+_LABEL = TaxonomyFields.LABEL.value
+_DESCRIPTION = TaxonomyFields.DESCRIPTION.value
+_MAPPING = TaxonomyFields.MAPPING.value
+_EXAMPLE = TaxonomyFields.EXAMPLE.value
+_REFERENCE = TaxonomyFields.REFERENCE.value
+_ATTR_ID = AttributeFields.ID.value
+_ATTR_NAME = AttributeFields.ATTRIBUTE_NAME.value
+_ATTR_DESCRIPTION = AttributeFields.DESCRIPTION.value
+_ATTR_OCX_NAME = AttributeFields.OCX_NAME.value
+_ATTR_REQUIRED = AttributeFields.REQUIRED.value
+_ATTR_DATA_TYPE = AttributeFields.DATA_TYPE.value
+# Type description of attributes restricted to an enumeration of strings
+_XS_STRING_RESTRICTION = "Restriction of type xs:string"
+
+# The taxonomy sheet columns
+_NODE_COLUMNS = (_ID, _PARENT_ID, _LABEL, _DESCRIPTION, _MAPPING, _EXAMPLE, _REFERENCE)
+# The attributes sheet columns
+_ATTRIBUTE_COLUMNS = (_ATTR_ID, _ATTR_NAME, _ATTR_DESCRIPTION, _ATTR_OCX_NAME, _ATTR_REQUIRED, _ATTR_DATA_TYPE)
+
+# Seconds a downloaded schema is reused before it is downloaded again
+_SCHEMA_CACHE_SECONDS = 86400
+# Marker file written next to the schema files of a completed download
+_SCHEMA_MARKER = '.downloaded'
+
+# Sentinel for names not yet in the global element cache
+_MISS = object()
+# Namespace prefixes by schema type name
+_ns_cache: dict[str, Union[str, None]] = {}
+
+# Characters not allowed in XML 1.0 documents
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                  '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                  '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                  '<Default Extension="xml" ContentType="application/xml"/>'
+                  '<Override PartName="/xl/workbook.xml" '
+                  'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                  '<Override PartName="/xl/sharedStrings.xml" '
+                  'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+                  '{overrides}</Types>')
+_SHEET_CONTENT_TYPE = ('<Override PartName="/xl/worksheets/sheet{index}.xml" '
+                       'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+_ROOT_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+              '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+              '<Relationship Id="rId1" '
+              'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+              'Target="xl/workbook.xml"/></Relationships>')
+_WORKBOOK = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+             '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+             'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+             '<sheets>{sheets}</sheets></workbook>')
+_WORKBOOK_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                  '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                  '{relationships}</Relationships>')
+_SHEET_RELATIONSHIP = ('<Relationship Id="rId{index}" '
+                       'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                       'Target="worksheets/sheet{index}.xml"/>')
+_SHARED_STRINGS_RELATIONSHIP = ('<Relationship Id="rId{index}" '
+                                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+                                'Target="sharedStrings.xml"/>')
+_SHARED_STRINGS_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" uniqueCount="{count}">')
+_WORKSHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_WORKSHEET_TAIL = '</sheetData></worksheet>'
+# Number of worksheet rows serialised per write to the zip entry
+_ROWS_PER_WRITE = 1000
+# Number of serialised row batches the writer may lag behind the serialiser
+_QUEUED_WRITES = 8
+
+
+def _column_letter(index: int) -> str:
+    """Return the Excel column letter of the zero based column index."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref: str, value, shared_strings: dict) -> str:
+    """Return the cell XML of a value, empty for None. Text is stored once in the shared strings by its index."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    index = shared_strings.setdefault(str(value), len(shared_strings))
+    return f'<c r="{ref}" t="s"><v>{index}</v></c>'
+
+
+def _worksheet_chunks(rows: Iterable[list], shared_strings: dict) -> Iterator[bytes]:
+    """Yield the encoded worksheet XML of the rows, one batch of rows at a time."""
+    yield _WORKSHEET_HEAD.encode()
+    columns = []
+    xml_rows = []
+    for row_number, row in enumerate(rows, start=1):
+        columns.extend(_column_letter(i) for i in range(len(columns), len(row)))
+        cells = ''.join(_xlsx_cell(f'{column}{row_number}', value, shared_strings)
+                        for column, value in zip(columns, row))
+        xml_rows.append(f'<row r="{row_number}">{cells}</row>')
+        if len(xml_rows) == _ROWS_PER_WRITE:
+            yield ''.join(xml_rows).encode()
+            xml_rows.clear()
+    yield (''.join(xml_rows) + _WORKSHEET_TAIL).encode()
+
+
+def _serialise_worksheet(rows: Iterable[list], shared_strings: dict, chunks: queue.Queue) -> None:
+    """Put the worksheet XML chunks on the queue, followed by None when done or failed."""
+    try:
+        for chunk in _worksheet_chunks(rows, shared_strings):
+            chunks.put(chunk)
+    finally:
+        chunks.put(None)
+
+
+def _write_xlsx_direct(file_path: Path, sheets: List[Tuple[str, Iterable[list]]]) -> None:
+    """
+    Write the sheets to an xlsx file by emitting the worksheet XML directly, bypassing pandas and openpyxl.
+    The rows are serialised on a worker thread and handed over in batches through a bounded queue,
+    so the compression and disk writes of one batch overlap with the serialisation of the next.
+    Text is deduplicated in a shared strings table, since descriptions are often repeated across elements.
+
+    Args:
+        file_path: The xlsx file
+        sheets: The sheet names and their rows, the first row being the header
+    """
+    with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as xlsx, ThreadPoolExecutor(max_workers=1) as executor:
+        indices = range(1, len(sheets) + 1)
+        xlsx.writestr('[Content_Types].xml', _CONTENT_TYPES.format(
+            overrides=''.join(_SHEET_CONTENT_TYPE.format(index=index) for index in indices)))
+        xlsx.writestr('_rels/.rels', _ROOT_RELS)
+        xlsx.writestr('xl/workbook.xml', _WORKBOOK.format(sheets=''.join(
+            f'<sheet name={quoteattr(name)} sheetId="{index}" r:id="rId{index}"/>'
+            for index, (name, _) in zip(indices, sheets))))
+        xlsx.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.format(
+            relationships=''.join(_SHEET_RELATIONSHIP.format(index=index) for index in indices) +
+            _SHARED_STRINGS_RELATIONSHIP.format(index=len(sheets) + 1)))
+        # The index of each distinct text, in insertion order. Only the worker adds to it.
+        shared_strings = {}
+        for index, (_, rows) in zip(indices, sheets):
+            chunks = queue.Queue(maxsize=_QUEUED_WRITES)
+            serialised = executor.submit(_serialise_worksheet, rows, shared_strings, chunks)
+            pending = iter(chunks.get, None)
+            try:
+                with xlsx.open(f'xl/worksheets/sheet{index}.xml', 'w') as worksheet:
+                    for chunk in pending:
+                        worksheet.write(chunk)
+            finally:
+                # Drain what is left if the write failed, so the worker is not blocked on a full queue
+                for _ in pending:
+                    pass
+            serialised.result()
+        with xlsx.open('xl/sharedStrings.xml', 'w') as strings:
+            strings.write(_SHARED_STRINGS_HEAD.format(count=len(shared_strings)).encode())
+            for batch in itertools.batched(shared_strings, _ROWS_PER_WRITE):
+                strings.write(''.join(f'<si><t xml:space="preserve">{escape(_ILLEGAL_XML_CHARS.sub("", text))}</t></si>'
+                                      for text in batch).encode())
+            strings.write(b'</sst>')
+
+
+class TaxonomyTable:
+    """The taxonomy nodes as a struct of arrays, one list per taxonomy column."""
+
+    def __init__(self):
+        self.ids = []
+        self.parent_ids = []
+        self.labels = []
+        self.descriptions = []
+        self.mappings = []
+        self.examples = []
+        self.references = []
+        self._columns = (self.ids, self.parent_ids, self.labels, self.descriptions, self.mappings, self.examples,
+                         self.references)
+        self._row_index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, taxonomy_id: str) -> bool:
+        return taxonomy_id in self._row_index
+
+    def __getitem__(self, taxonomy_id: str) -> dict:
+        """Return a dict view of the node."""
+        row = self._row_index[taxonomy_id]
+        return {column: values[row] for column, values in zip(_NODE_COLUMNS[1:], self._columns[1:])}
+
+    def set_row(self, taxonomy_id: str, *values):
+        """Append the node values in column order, replacing the row of an existing taxonomy id."""
+        row = self._row_index.get(taxonomy_id)
+        if row is None:
+            self._row_index[taxonomy_id] = len(self.ids)
+            for column, value in zip(self._columns, (taxonomy_id, *values)):
+                column.append(value)
+        else:
+            for column, value in zip(self._columns, (taxonomy_id, *values)):
+                column[row] = value
+
+    def rows(self) -> Iterator[tuple]:
+        """Iterate over the node rows in column order."""
+        return zip(*self._columns)
+
 
 class OcxTaxonomy:
     """Class to represent the OCX Taxonomy."""
 
     def __init__(self, taxonomy: dict = None, attributes: list = None):
         self.transformer = Transformer()
-        self.taxonomy = taxonomy if taxonomy is not None else {}
-        self.taxonomy_attributes = attributes if attributes is not None else []
+        self.taxonomy = TaxonomyTable()
+        for taxonomy_id, node in (taxonomy or {}).items():
+            self.taxonomy.set_row(taxonomy_id, *(node.get(column) for column in _NODE_COLUMNS[1:]))
+        # The attribute rows in the column order of the attributes sheet
+        self.taxonomy_attributes = [tuple(attr.get(column) for column in _ATTRIBUTE_COLUMNS)
+                                    for attr in (attributes or [])]
+        # Global elements by name, None for names that are not global elements
+        self._elem_cache: dict[str, Union[OcxGlobalElement, None]] = {}
 
     def get_transformer(self) -> Transformer:
         """Get the OCX transformer."""
         return self.transformer
 
     def transform_schema_from_url(self, folder: Path, url:str, ) -> bool:
-        """Load and transform the OCX schema from the url."""
-        if self.transformer.transform_schema_from_url(url, folder):
+        """Load and transform the OCX schema from the url.
+
+        The schema is downloaded to a sub folder of ``folder`` named after the sha1 of the url, and reused from there
+        for ``_SCHEMA_CACHE_SECONDS`` after the download.
+        """
+        schema_folder = Path(folder) / hashlib.sha1(url.encode()).hexdigest()
+        marker = schema_folder / _SCHEMA_MARKER
+        result = False
+        if (marker.exists() and time.time() - marker.stat().st_mtime < _SCHEMA_CACHE_SECONDS
+                and any(schema_folder.glob('*.xsd'))):
+            logger.info(f"Using OCX schema from {url} previously downloaded to {schema_folder}")
+            try:
+                result = self.transformer.transform_schema_from_folder(schema_folder)
+            except Exception as e:
+                logger.warning(f"Error parsing the downloaded OCX schema in {schema_folder}: {e}")
+            if not result:
+                logger.warning(f"Failed to parse the downloaded OCX schema in {schema_folder}, downloading it again")
+                self.transformer = Transformer()
+        if not result:
+            marker.unlink(missing_ok=True)
+            result = self.transformer.transform_schema_from_url(url, schema_folder)
+            if result:
+                marker.touch()
+        if result:
+            self._elem_cache.clear()
             logger.info(f"Successfully loaded OCX schema from {url}")
             return True
         else:
@@ -34,27 +280,22 @@ class OcxTaxonomy:
 
 
     def get_global_element_from_name(self, name:str) -> Union[OcxGlobalElement, None]:
-        """Get the global element from its name."""
-        if self.transformer.is_transformed() is not True:
-            logger.error("The schema has not been transformed yet.")
-            return None
+        """Get the global element from its name. The schema must be transformed."""
+        hit = self._elem_cache.get(name, _MISS)
+        if hit is not _MISS:
+            return hit
         element = self.transformer.get_ocx_element_from_type(name)
-        if isinstance(element, OcxGlobalElement):
-            return element
-        else:
+        if not isinstance(element, OcxGlobalElement):
             logger.error(f"The element {name} is not a global element.")
-            return None
+            element = None
+        self._elem_cache[name] = element
+        return element
 
     def iter_children(self, element: OcxGlobalElement, filter:bool = False,
                       filter_type:str = "ocx:Quantity_T") -> Iterator[OcxSchemaChild] :
-        """Iterate over the children of the element."""
-        if self.transformer.is_transformed() is not True:
-            logger.error("The schema has not been transformed yet.")
-            pass
+        """Iterate over the children of the element, optionally only the children of the filter_type."""
         for child in element.get_children():
-            if filter and child.type == filter_type:
-                yield child
-            else:
+            if not filter or child.type == filter_type:
                 yield child
 
     def add_node(self, element:Union[OcxGlobalElement, OcxSchemaChild], taxonomy_id:str, parent_id:str):
@@ -64,36 +305,34 @@ class OcxTaxonomy:
         for attribute in element.get_attributes():
             self.add_attribute(element=attribute, id=taxonomy_id)
         # Add the node
-        node = {
-            TaxonomyFields.PARENT_ID.value: parent_id,
-            TaxonomyFields.LABEL.value: camel_to_sentence(element.get_name()),
-            TaxonomyFields.DESCRIPTION.value: element.get_annotation(),
-            TaxonomyFields.MAPPING.value: f'{element.get_prefix()}:{element.get_name()}',
-            TaxonomyFields.EXAMPLE.value: "",  # Placeholder for example
-            TaxonomyFields.REFERENCE.value: "",  # Placeholder for reference
-            # TaxonomyFields.MANDATORY.value: element.get_cardinality()
-        }
-        logger.debug(f"Adding node: {taxonomy_id} under parent: {parent_id}")
-        self.taxonomy[taxonomy_id] = node
+        logger.debug("Adding node: {} under parent: {}", taxonomy_id, parent_id)
+        # Interned so repeated descriptions share one string object
+        annotation = element.get_annotation()
+        self.taxonomy.set_row(taxonomy_id, parent_id,
+                              camel_to_sentence(element.get_name()),
+                              sys.intern(annotation) if annotation else annotation,
+                              f'{element.get_prefix()}:{element.get_name()}',
+                              "",  # Placeholder for example
+                              "")  # Placeholder for reference
         return
 
     def add_attribute(self, element:OcxSchemaAttribute, id:str,):
         """Add taxonomy attributes."""
-        attr = {
-            AttributeFields.ID.value: id,
-            AttributeFields.ATTRIBUTE_NAME.value: element.name,
-            AttributeFields.DESCRIPTION.value: element.description,
-            AttributeFields.OCX_NAME.value: f'{element.prefix}:{element.name}',
-            AttributeFields.REQUIRED.value: True if element.use == "req." else False,
-            AttributeFields.DATA_TYPE.value: 'enum' if 'Restriction of type xs:string' in element.type else 'string',
-        }
-        logger.debug(f"Adding attribute: {attr.get(AttributeFields.OCX_NAME.value)} under parent: {id}")
-        self.taxonomy_attributes.append(attr)
+        data_type = 'enum' if _XS_STRING_RESTRICTION in element.type else 'string'
+        ocx_name = f'{element.prefix}:{element.name}'
+        logger.debug("Adding attribute: {} under parent: {}", ocx_name, id)
+        # The row is created in its final sheet form, see _ATTRIBUTE_COLUMNS
+        self.taxonomy_attributes.append((id, element.name, element.description, ocx_name, element.use == "req.",
+                                         data_type))
 
 
 
     def build_taxonomy_from_ocx_name(self, parent_id: str, ocx_name: str, full_graph:bool=False,): # Todo: Fix missing units
         """Build the taxonomy starting from the ocx_name."""
+        # Checked once here rather than for every element visited in the walk
+        if self.transformer.is_transformed() is not True:
+            logger.error("The schema has not been transformed yet.")
+            return
         element = self.get_global_element_from_name(ocx_name)
         if element is None:
             logger.error(f"Element {ocx_name} not found.")
@@ -106,36 +345,56 @@ class OcxTaxonomy:
         self._build_taxonomy_recursive(element, parent_id=taxonomy_id, full_graph=full_graph)
 
     def _build_taxonomy_recursive(self, element: OcxGlobalElement, parent_id: str, full_graph:bool):
-        """Recursively build the taxonomy."""
-        for child in self.iter_children(element):
-            child_element = self.get_global_element_from_name(f'{LxmlElement.namespace_prefix(child.type)}:{child.name}')
-            if child_element and child_element.get_name() not in [ExcludeNodes.DESIGNVIEW.value]:
-                if full_graph:
-                    taxonomy_id = self.create_unique_taxonomy_id(name=child_element.get_name(), parent_id=parent_id)
-                else:
-                    taxonomy_id = f'{child_element.get_prefix()}_{child_element.get_name().lower()}'
-                self.add_node(child_element, taxonomy_id=taxonomy_id,parent_id=parent_id, )
-                self._build_taxonomy_recursive(child_element, parent_id=taxonomy_id, full_graph=full_graph)
+        """Build the taxonomy below the element, depth first using an explicit stack."""
+        get_element = self.get_global_element_from_name
+        namespace_prefix = LxmlElement.namespace_prefix
+        exclude = ExcludeNodes.DESIGNVIEW.value
+
+        def child_elements(parent: OcxGlobalElement) -> list:
+            elements = []
+            # Unfiltered, so iterate the children directly instead of through iter_children
+            for child in parent.get_children():
+                prefix = _ns_cache.get(child.type, _MISS)
+                if prefix is _MISS:
+                    prefix = _ns_cache[child.type] = namespace_prefix(child.type)
+                child_element = get_element(f'{prefix}:{child.name}')
+                if child_element and child_element.get_name() != exclude:
+                    elements.append(child_element)
+            return elements
+
+        def element_key(ocx_element: OcxGlobalElement) -> str:
+            return f'{ocx_element.get_prefix()}:{ocx_element.get_name()}'
+
+        # Push the children in reverse so they are added in schema order. Each entry carries the names of the
+        # elements on its ancestor path, so an element reachable from itself is not expanded again
+        ancestors = frozenset((element_key(element),))
+        stack = [(child_element, parent_id, ancestors) for child_element in reversed(child_elements(element))]
+        while stack:
+            child_element, parent_id, ancestors = stack.pop()
+            key = element_key(child_element)
+            if key in ancestors:
+                logger.warning("Skipping {} below {}, the element is one of its own ancestors.", key, parent_id)
+                continue
+            if full_graph:
+                taxonomy_id = self.create_unique_taxonomy_id(name=child_element.get_name(), parent_id=parent_id)
+            else:
+                taxonomy_id = f'{child_element.get_prefix()}_{child_element.get_name().lower()}'
+            self.add_node(child_element, taxonomy_id=taxonomy_id,parent_id=parent_id, )
+            path = ancestors | {key}
+            stack.extend((grandchild, taxonomy_id, path) for grandchild in reversed(child_elements(child_element)))
 
     def save_taxonomy_to_excel(self, file_path: Path, sheet_name: str = "taxonomy") -> bool:
         """Save the taxonomy to an Excel file."""
-        import pandas as pd
         try:
-            # Save taxonomy nodes
-            df = pd.DataFrame.from_dict(self.taxonomy, orient='index')
-            df.index.name = TaxonomyFields.ID.value
-            df.reset_index(inplace=True)
-            with pd.ExcelWriter(file_path, engine='openpyxl', mode='w') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-            logger.info(f"Taxonomy saved to {file_path} in sheet {sheet_name}")
+            # Save taxonomy nodes, the rows are passed straight from the table to the writer
+            sheets = [(sheet_name, itertools.chain([_NODE_COLUMNS], self.taxonomy.rows()))]
 
             # save attributes to a separate sheet
             if self.taxonomy_attributes:
-                df_attr = pd.DataFrame(self.taxonomy_attributes)
-                # df_attr.index.name = AttributeFields.ID.value
-                # df_attr.reset_index(inplace=True)
-                with pd.ExcelWriter(file_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                    df_attr.to_excel(writer, sheet_name="attributes", index=False)
+                sheets.append(("attributes", itertools.chain([_ATTRIBUTE_COLUMNS], self.taxonomy_attributes)))
+            _write_xlsx_direct(file_path, sheets)
+            logger.info(f"Taxonomy saved to {file_path} in sheet {sheet_name}")
+            if self.taxonomy_attributes:
                 logger.info(f"Attributes saved to {file_path} in sheet 'attributes'")
             return True
         except Exception as e:
@@ -152,9 +411,9 @@ class OcxTaxonomy:
         """Return a unique id"""
         id = camel_to_snake(name)
         if id in self.taxonomy:
-            unique_id = f'{parent_id}_{camel_to_snake(name)}'
-            logger.info(f"Creating unique id for {name}: {unique_id}.")
+            unique_id = f'{parent_id}_{id}'
+            logger.info("Creating unique id for {}: {}.", name, unique_id)
         else:
             unique_id = id
-            logger.info(f"Creating id for {name}: {unique_id}.")
+            logger.info("Creating id for {}: {}.", name, unique_id)
         return unique_id
\ No newline at end of file
@@ -1,7 +1,9 @@
 import csv
+import functools
 import zipfile
 from io import StringIO, BytesIO
 
+@functools.lru_cache(maxsize=1)
 def create_ship_pbs():
 
     # ----------------------------
@@ -47,7 +49,8 @@ def write_csv(csv_bytes:BytesIO, csv_file:str):
     :param csv_file: Path to the output CSV file.
     """
     with open(csv_file, 'wb') as f:
-        f.write(csv_bytes.getvalue())
+        # getbuffer() is a zero-copy view, getvalue() would copy the whole buffer
+        f.write(csv_bytes.getbuffer())
 
 def write_excel(xlsx_bytes:BytesIO, xlsx_file:str):
     """
@@ -57,9 +60,10 @@ def write_excel(xlsx_bytes:BytesIO, xlsx_file:str):
     :param xlsx_file: Path to the output Excel file.
     """
     with open(xlsx_file, 'wb') as f:
-        f.write(xlsx_bytes.getvalue())
+        f.write(xlsx_bytes.getbuffer())
 
 
+@functools.lru_cache(maxsize=1)
 def create_sfi_cheat_sheet():
     """
 
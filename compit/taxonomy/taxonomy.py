@@ -1,3 +1,4 @@
+import functools
 import graphviz
 import networkx as nx
 import plotly.graph_objects as go
@@ -5,12 +6,39 @@ import numpy as np
 import matplotlib.pyplot as plt
 from taxonomy.taxonomy_common import (AttributeFields, RancDir, TaxonomyFields,
                                       ExcludeAttributes, GraphvizColors)
+from taxonomy.load_taxonomy import build_child_index
 from ocx_schema_parser.transformer import Transformer
 from ocx_schema_parser.data_classes import OcxEnumerator
 from typing import List, Tuple, Union
 from collections import defaultdict
 from loguru import logger
 
+# Field keys resolved once for the per-node loops
+_PARENT_ID = TaxonomyFields.PARENT_ID.value
+_LABEL = TaxonomyFields.LABEL.value
+_DESCRIPTION = TaxonomyFields.DESCRIPTION.value
+_MAPPING = TaxonomyFields.MAPPING.value
+_REFERENCE = TaxonomyFields.REFERENCE.value
+_ATTR_REQUIRED = AttributeFields.REQUIRED.value
+# The fixed node colors of the document references
+_REFERENCE_COLORS = {'AP215': GraphvizColors.LIGHTBLUE.value, 'AP218': GraphvizColors.LIGHTGREEN.value,
+                     "Root": GraphvizColors.LIGHTYELLOW.value}
+# The attribute names left out of the node labels
+_EXCLUDED_ATTRIBUTES = frozenset(excluded_attr.value for excluded_attr in ExcludeAttributes)
+
+
+@functools.lru_cache(maxsize=None)
+def _ocx_url(ocx_type: str) -> str:
+    """Create the DokuWiki url to ocx type. Cached since many nodes map to the same type."""
+    logger.debug('Adding link to OCX wiki for type: {}', ocx_type)
+    if ocx_type is None or ocx_type == '':
+        return ''
+    if '@' in ocx_type:
+        ocx_type = ocx_type.split('@')[0]
+    base_url = f"https://ocxwiki.3docx.org/doku.php?id=public:schema:3.1.0:{ocx_type}"
+    return base_url
+
+
 def create_graphviz_chart(dot:graphviz.Digraph, taxonomy, output_path='taxonomy_chart', filter_reference=None, max_depth=None,
                           exclude_id: bool = False, rankdir: RancDir = RancDir.TB, show_depth: bool = False,
                           color_field: TaxonomyFields = None, ocx_name:bool = False) -> bool:
@@ -30,109 +58,74 @@ def create_graphviz_chart(dot:graphviz.Digraph, taxonomy, output_path='taxonomy_
         rankdir (RancDir, optional): Direction of graph layout (TB, BT, LR, RL)
     """
 
-    def get_node_color(node_key: str, color_enabled: bool, color_map: dict,
-                       default_color: GraphvizColors = GraphvizColors.DEFAULT.value) -> GraphvizColors:
-        """Get color for node based on node key and color map.
-
-        Args:
-            node_key (str): Key to look up color for
-            color_enabled (bool): Whether coloring is enabled
-            color_map (dict): Mapping of keys to colors
-            default_color (GraphvizColors): Default color if no match found
-
-        Returns:
-            str: Color string to use for node
-        """
-        if not color_enabled or not node_key:
-            return default_color
-        return color_map.get(node_key, default_color)
-
-    def url(ocx_type:str) -> str:
-        """Create the DokuWiki url to ocx type."""
-        logger.debug(f'Adding link to OCX wiki for type: {ocx_type}')
-        if ocx_type is None or ocx_type == '':
-            return ''
-        if '@' in ocx_type:
-            ocx_type = ocx_type.split('@')[0]
-        base_url = f"https://ocxwiki.3docx.org/doku.php?id=public:schema:3.1.0:{ocx_type}"
-        return base_url
-
-    def map_color(reference:str) -> Union[str, None]:
-        """Map a string ID to a color."""
-        mapped_colors ={'AP215': GraphvizColors.LIGHTBLUE.value,'AP218': GraphvizColors.LIGHTGREEN.value, "Root": GraphvizColors.LIGHTYELLOW.value,}
-        if reference in mapped_colors:
-            return mapped_colors[reference]
-        else:
-            return None
-
-
-    def should_include_node(node_id, current_depth=0):
+    def should_include_node(data, current_depth=0):
         if max_depth is not None and current_depth > max_depth:
             return False
-        return (filter_reference is None or
-                taxonomy[node_id][TaxonomyFields.REFERENCE.value] == filter_reference)
+        return filter_reference is None or data[_REFERENCE] == filter_reference
 
     def should_incude_attribute(name):
-        exluded = [excluded_attr.value for excluded_attr in ExcludeAttributes]
-        if name in exluded:
-            return False
-        else:
-            return True
-
-    def get_node_depth(node_id, depth=0):
-        """Calculate depth of a node by traversing up to root"""
-        node = taxonomy.get(node_id)
-        if not node or not node[TaxonomyFields.PARENT_ID.value]:
-            return depth
-        return get_node_depth(node[TaxonomyFields.PARENT_ID.value], depth + 1)
+        return name not in _EXCLUDED_ATTRIBUTES
+
+    # The depth of each visited node, so every ancestor chain is walked only once
+    depth_cache = {}
+
+    def get_node_depth(node_id):
+        """Calculate depth of a node by traversing up to root or the first ancestor with a known depth"""
+        path = []
+        while node_id not in depth_cache:
+            node = taxonomy.get(node_id)
+            if not node or not node[_PARENT_ID]:
+                depth_cache[node_id] = 0
+                break
+            path.append(node_id)
+            if len(path) > len(taxonomy):
+                raise ValueError(f'The parent chain of node {path[0]} is cyclic.')
+            node_id = node[_PARENT_ID]
+        depth = depth_cache[node_id]
+        for visited in reversed(path):
+            depth += 1
+            depth_cache[visited] = depth
+        return depth
 
     def format_node_label(node_id, data) -> str:
         """Format node label with attributes using HTML-like syntax"""
         try:
-            logger.debug(f'Formatting label for node {node_id} and data:{data}')
-            label = '<<TABLE BORDER="0" CELLBORDER="0" CELLSPACING="0">'
+            logger.debug('Formatting label for node {} and data:{}', node_id, data)
+            parts = ['<<TABLE BORDER="0" CELLBORDER="0" CELLSPACING="0">']
 
             if show_depth:
-                label += f'<TR><TD>{get_node_depth(node_id)}</TD></TR>'
+                parts.append(f'<TR><TD>{depth_cache[node_id]}</TD></TR>')
 
             # Add node ID and/or label
+            if ocx_name and data.get(_MAPPING, ""):
+                title = data[_MAPPING]
+            else:
+                title = data.get(_LABEL, "")
             if exclude_id:
-                if ocx_name and data.get(TaxonomyFields.MAPPING.value, ""):
-                    label += f'<TR><TD><B>{data[TaxonomyFields.MAPPING.value]}</B></TD></TR>'
-                else:
-                    label += f'<TR><TD><B>{data.get("label", "")}</B></TD></TR>'
+                parts.append(f'<TR><TD><B>{title}</B></TD></TR>')
             else:
-                if ocx_name and data.get(TaxonomyFields.MAPPING.value, ""):
-                    label += f'<TR><TD><B>{data[TaxonomyFields.MAPPING.value]}</B><BR/>{node_id}</TD></TR>'
-                else:
-                    label += f'<TR><TD><B>{data.get(TaxonomyFields.LABEL.value, "")}</B><BR/>{node_id}</TD></TR>'
+                parts.append(f'<TR><TD><B>{title}</B><BR/>{node_id}</TD></TR>')
 
             # Only process attributes if they exist and are not empty
             attributes = data.get("attributes", {})
             if attributes and isinstance(attributes, dict) and len(attributes) > 0:
-                # Sort attributes: required first, then optional
-                sorted_attrs = sorted(
-                    attributes.items(),
-                    key=lambda item: not item[1].get(AttributeFields.REQUIRED.value, False)
-                )
+                # Order attributes: required first, then optional, each in their original order
+                required, optional = [], []
+                for item in attributes.items():
+                    (required if item[1].get(_ATTR_REQUIRED, False) else optional).append(item)
+                sorted_attrs = required + optional
 
                 # Add attributes if we have any after filtering
                 if sorted_attrs:
-                    label += '<TR><TD>'
-                    attrs = []
-                    for name, attr in sorted_attrs:
-                        if should_incude_attribute(name):
-                            if attr.get(AttributeFields.REQUIRED.value, False):
-                                attrs.append(f'<FONT POINT-SIZE="10" COLOR="red"><B>{name}</B></FONT>')
-                            else:
-                                attrs.append(f'<FONT POINT-SIZE="10" COLOR="green">{name}</FONT>')
-                    if attrs:
-                        label += '<BR/>'.join(attrs)
-                    label += '</TD></TR>'
+                    attrs = [f'<FONT POINT-SIZE="10" COLOR="red"><B>{name}</B></FONT>'
+                             if attr.get(_ATTR_REQUIRED, False)
+                             else f'<FONT POINT-SIZE="10" COLOR="green">{name}</FONT>'
+                             for name, attr in sorted_attrs if should_incude_attribute(name)]
+                    parts.append(f'<TR><TD>{"<BR/>".join(attrs)}</TD></TR>')
 
             # Close table
-            label += '</TABLE>>'
-            return label
+            parts.append('</TABLE>>')
+            return ''.join(parts)
 
         except Exception as e:
             logger.error(f"Error formatting label for node {node_id}: {str(e)}")
@@ -146,34 +139,40 @@ def create_graphviz_chart(dot:graphviz.Digraph, taxonomy, output_path='taxonomy_
                  fontname='Arial',
                  margin='0.2')
 
+        # Map each distinct value of the color field to a color, built once for all nodes
+        color_key = color_field.value if color_field is not None else None
+        color_map = {}
+        if color_key is not None:
+            color_map = {value: color.value for value, color in zip(set(
+                data[color_key] for data in taxonomy.values() if data.get(color_key)),
+                list(GraphvizColors)[:-1])}  # exclude DEFAULT color
+            # The fixed colors of the document references take precedence
+            color_map.update(_REFERENCE_COLORS)
+        default_color = GraphvizColors.DEFAULT.value
+
         # Add nodes and edges
         for node_id, data in taxonomy.items():
             current_depth = get_node_depth(node_id)
-            logger.debug(f'Adding node with id: {node_id} and depth {current_depth}')
-            if should_include_node(node_id, current_depth):
+            logger.debug('Adding node with id: {} and depth {}', node_id, current_depth)
+            if should_include_node(data, current_depth):
                 # Create formatted label with attributes
                 label = format_node_label(node_id, data)
-                logger.debug(f'The node has label: {label}')
+                logger.debug('The node has label: {}', label)
                 # Set the node color based on document field if enabled
-                fillcolor = GraphvizColors.DEFAULT.value
-                if color_field is not None and color_field.value in data:
-                    fillcolor = map_color(data[color_field.value])
-                    if fillcolor is None:
-                        color_map = {value: color.value for value, color in zip(set(
-                            data[color_field.value] for data in taxonomy.values() if data.get(color_field.value)),
-                                                                                list(GraphvizColors)[
-                                                                                :-1])}  # exclude DEFAULT color
-                        fillcolor = get_node_color(data[color_field.value], color_enabled=True, color_map=color_map)
-                        logger.debug(f'The color map is {color_map} and fill color is {fillcolor}')
+                fillcolor = default_color
+                if color_key is not None and color_key in data:
+                    fillcolor = color_map.get(data[color_key], default_color)
+                    logger.debug('The color map is {} and fill color is {}', color_map, fillcolor)
                 # Create node
-                tooltip = data.get(TaxonomyFields.DESCRIPTION.value, '')
+                tooltip = data.get(_DESCRIPTION, '')
                 tooltip = '' if tooltip is None else tooltip.replace('"', "'").replace('\n', ' ')
-                logger.debug(f'The tooltip is: {tooltip}')
+                logger.debug('The tooltip is: {}', tooltip)
                 dot.node(node_id, label, fillcolor=fillcolor, tooltip=tooltip,
-                         URL=url(data.get(TaxonomyFields.MAPPING.value, '')), target="_blank")
-                # Create edge if there's a parent and parent is within depth limit
-                if data[TaxonomyFields.PARENT_ID.value] and (max_depth is None or current_depth <= max_depth):
-                    dot.edge(data[TaxonomyFields.PARENT_ID.value], node_id)
+                         URL=_ocx_url(data.get(_MAPPING, '')), target="_blank")
+                # Create edge if there's a parent, the depth limit is already checked by should_include_node
+                parent_id = data[_PARENT_ID]
+                if parent_id:
+                    dot.edge(parent_id, node_id)
     except Exception as e:
         logger.error(f"Error creating graphviz chart: {str(e)}")
         raise Exception from e
@@ -229,12 +228,14 @@ def visualize_clustered_taxonomy_old(graphs: list,  output_chart: str = 'cluster
                                   ocx_name=ocx_name)
         # Add cross-hierarchy relationships
         # Only left-right relationships are supported
+        targets = graphs[1]
         for node_id, data in graphs[0].items():
                 # Example: Add an edge between node_id_1 in graph 1 and node_id_2 in graph 2
                 # Replace 'node_id_1' and 'node_id_2' with actual node IDs from your taxonomy
-                if data[TaxonomyFields.MAPPING.value] != '' and data[TaxonomyFields.MAPPING.value] is not None:
-                    target_id = data[TaxonomyFields.MAPPING.value].replace(':', '_')
-                    if target_id in graphs[1]:
+                mapping = data[_MAPPING]
+                if mapping:
+                    target_id = mapping.replace(':', '_')
+                    if target_id in targets:
                         # Add an edge
                         dot.edge(node_id, target_id,
                                  color='red',  # Optional: different color for cross-hierarchy links
@@ -262,12 +263,16 @@ def visualize_clustered_taxonomy(graphs: list, output_chart: str = 'clustered_ta
         dot = graphviz.Digraph(comment='Taxonomy Hierarchy')
         dot.attr(compound='true')  # Remove global rankdir
 
+        # Find the root of each graph once, the first node without a parent
+        roots = [next((node_id for node_id, data in graph.items() if not data[_PARENT_ID]), None)
+                 for graph in graphs]
+        if None in roots:
+            raise ValueError(f'Taxonomy {roots.index(None) + 1} has no root node.')
+
         # Create invisible nodes to control positioning
         with dot.subgraph(name='root_nodes') as s:
             s.attr(rank='same')  # Force root nodes to be at same level
-            for i, graph in enumerate(graphs):
-                root = next(node_id for node_id, data in graph.items()
-                            if not data[TaxonomyFields.PARENT_ID.value])
+            for i in range(len(graphs)):
                 s.node(f'root_{i}', style='invis')
 
         # Create subgraphs with different rankdir values
@@ -290,15 +295,15 @@ def visualize_clustered_taxonomy(graphs: list, output_chart: str = 'clustered_ta
                                       ocx_name=ocx_name)
 
                 # Force root node position
-                root = next(node_id for node_id, data in graph.items()
-                            if not data[TaxonomyFields.PARENT_ID.value])
-                dot.edge(f'root_{i}', root, style='invis')
+                dot.edge(f'root_{i}', roots[i], style='invis')
 
         # Add cross-hierarchy relationships
+        targets = graphs[1]
         for node_id, data in graphs[0].items():
-            if data[TaxonomyFields.MAPPING.value]:
-                target_id = data[TaxonomyFields.MAPPING.value].replace(':', '_').lower()
-                if target_id in graphs[1]:
+            mapping = data[_MAPPING]
+            if mapping:
+                target_id = mapping.replace(':', '_').lower()
+                if target_id in targets:
                     dot.edge(node_id, target_id,
                              color='red',
                              style='dashed',
@@ -322,39 +327,70 @@ def visualize_with_plotly(graphs: list, output_file: str = 'taxonomy'):
     # Add nodes and edges
     for i, graph in enumerate(graphs):
         for node_id, data in graph.items():
-            G.add_node(node_id, group=i, label=data[TaxonomyFields.LABEL.value])
-            if data[TaxonomyFields.PARENT_ID.value]:
-                G.add_edge(data[TaxonomyFields.PARENT_ID.value], node_id)
+            G.add_node(node_id, group=i, label=data[_LABEL])
+            if data[_PARENT_ID]:
+                G.add_edge(data[_PARENT_ID], node_id)
 
     # Add mappings
+    targets = graphs[1]
     for node_id, data in graphs[0].items():
-        if data[TaxonomyFields.MAPPING.value]:
-            target_id = data[TaxonomyFields.MAPPING.value].replace(':', '_')
-            if target_id in graphs[1]:
+        mapping = data[_MAPPING]
+        if mapping:
+            target_id = mapping.replace(':', '_')
+            if target_id in targets:
                 G.add_edge(node_id, target_id, edge_type='mapping')
 
     # Calculate layout
     pos = nx.spring_layout(G, k=1 / np.sqrt(len(G.nodes())), iterations=50)
 
-    # Create Plotly figure
-    edge_x, edge_y = [], []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
+    # The node coordinates and groups as arrays, in the node order of the graph
+    nodes = G.nodes(data='group', default=-1)
+    node_pos = np.array([pos[node] for node, _ in nodes], dtype=np.float64).reshape(-1, 2)
+    node_group = np.fromiter((group for _, group in nodes), dtype=np.int64, count=len(nodes))
+    node_index = {node: i for i, node in enumerate(G.nodes())}
+
+    # Edge coordinates as start, end and a NaN gap per edge, filled from the node array in one step
+    edges = np.array([(node_index[u], node_index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    edge_x = np.full(3 * len(edges), np.nan)
+    edge_y = np.full(3 * len(edges), np.nan)
+    edge_x[0::3], edge_y[0::3] = node_pos[edges[:, 0]].T
+    edge_x[1::3], edge_y[1::3] = node_pos[edges[:, 1]].T
 
+    # Create Plotly figure
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=edge_x, y=edge_y, mode='lines'))
 
-    # Add nodes colored by group
+    # Add nodes colored by group, selecting the coordinates of each group with a mask over the node array
     for i in range(len(graphs)):
-        node_x = [pos[node][0] for node in G.nodes() if G.nodes[node]['group'] == i]
-        node_y = [pos[node][1] for node in G.nodes() if G.nodes[node]['group'] == i]
-        fig.add_trace(go.Scatter(x=node_x, y=node_y, mode='markers+text'))
+        in_group = node_group == i
+        fig.add_trace(go.Scatter(x=node_pos[in_group, 0], y=node_pos[in_group, 1], mode='markers+text'))
 
     fig.write_html(output_file)
 
+def _clark_tag(qualified_name: str, ns: dict) -> str:
+    """Return the {namespace}name tag of a prefixed name, or the name itself if it has no prefix."""
+    prefix, separator, local_name = qualified_name.partition(':')
+    if not separator:
+        return qualified_name
+    return f'{{{ns.get(prefix, "")}}}{local_name}'
+
+
+def get_descendants(node_id: str, child_index: dict) -> List[str]:
+    """Get all descendants of a node in depth-first order using the child index from build_child_index.
+    Nodes already visited through a parent cycle are skipped."""
+    descendants = []
+    seen = {node_id}
+    stack = list(reversed(child_index.get(node_id, [])))
+    while stack:
+        child_id = stack.pop()
+        if child_id in seen:
+            continue
+        seen.add(child_id)
+        descendants.append(child_id)
+        stack.extend(reversed(child_index.get(child_id, [])))
+    return descendants
+
+
 def ocx_coverage_report(source:dict, target:Transformer, dimensions:List[str]) -> Tuple[dict,list]:
     """
     Generate a coverage report of the mapping from source to target.
@@ -366,68 +402,54 @@ def ocx_coverage_report(source:dict, target:Transformer, dimensions:List[str]) -
     # Get all global OCX names
     ocx_elements = target.parser.get_lookup_table()
     enumerations = target.get_enumerators()
+    # The enumeration values as sets for O(1) membership checks
+    enum_values = {name: set(enum.to_dict().get('Value', [])) for name, enum in enumerations.items()}
     # Get the schema namespaces
     ns = target.parser.get_namespaces()
-    for dim in dimensions:
-        # Get all children of this dimension recursively
-        def get_children(node_id):
-            children = []
-            for child_id, child_data in source.items():
-                if child_data[TaxonomyFields.PARENT_ID.value] == node_id:
-                    children.append(child_id)
-                    children.extend(get_children(child_id))
-            return children
 
+    def resolve_mapping(mapped_id: str) -> Tuple[list, Union[str, list]]:
+        """Return the target tags a mapping resolves to, and the tag or tags that were looked up."""
+        if '@' in mapped_id:
+            ocx_name, _, enumeration = mapped_id.partition('@')
+            ocx_tag = _clark_tag(ocx_name, ns)
+            enum_name, _, enum_value = enumeration.partition('#')
+            logger.debug('Mapping {} has enumeration type {}.', mapped_id, (enum_name, enum_value))
+            found = ocx_tag in ocx_elements and enum_value in enum_values.get(enum_name, ())
+            return ([ocx_tag] if found else []), ocx_tag
+        # Handle substitution groups
+        elif '=' in mapped_id and '[' in mapped_id:
+            base_element, substitutes = mapped_id.split('=')
+            # Clean up the substitutes string and split into list
+            tags = [_clark_tag(s.strip(), ns) for s in substitutes.strip('[]').split(',')]
+            return [tag for tag in tags if tag in ocx_elements], tags
+        ocx_tag = _clark_tag(mapped_id, ns)
+        return ([ocx_tag] if ocx_tag in ocx_elements else []), ocx_tag
+
+    # The resolution of each distinct mapping, since many nodes share the same mapping
+    resolved = {}
+    child_index = build_child_index(source)
+    for dim in dimensions:
         # Get all nodes under this dimension
-        dimension_nodes = get_children(dim)
-        logger.debug(f'Found {len(dimension_nodes)} children for dimension {dim}.')
+        dimension_nodes = get_descendants(dim, child_index)
+        logger.debug('Found {} children for dimension {}.', len(dimension_nodes), dim)
         # dimension_nodes.append(dim)  # Include the dimension itself
 
         # Check mappings for all nodes under this dimension
         for node_id in dimension_nodes:
-            tags = []
-            if source[node_id].get(TaxonomyFields.MAPPING.value):
-                mapped_id = source[node_id][TaxonomyFields.MAPPING.value]
-                enum_type = None
-                if '@' in mapped_id:
-                    ocx_tag = mapped_id.split('@')[0]
-                    ocx_tag = '{' + f'{ns.get(ocx_tag.split(':')[0], '')}' + '}' + f'{ocx_tag.split(":")[1]}'
-                    enum_type = (mapped_id.split('@')[1].split('#')[0], mapped_id.split('#')[1])
-                    logger.debug(f'Node {node_id} ({source[node_id][TaxonomyFields.LABEL.value]}) has enumeration type {enum_type}.')
-
-                # Handle substituition groups
-                elif '=' in mapped_id and '[' in mapped_id:
-                    # Handle substitution groups
-                    base_element, substitutes = mapped_id.split('=')
-                    # Clean up the substitutes string and split into list
-                    substitutes = substitutes.strip('[]').split(',')
-                    substitutes = [s.strip() for s in substitutes]
-                    for substitute in substitutes:
-                        if ':' in substitute:
-                            tags.append('{' + f'{ns.get(substitute.split(":")[0], "")}' + '}' + f'{substitute.split(":")[1]}')
-                        else:
-                            tags.append(substitute)
+            node = source[node_id]
+            mapped_id = node.get(_MAPPING)
+            if mapped_id:
+                if mapped_id not in resolved:
+                    resolved[mapped_id] = resolve_mapping(mapped_id)
+                found, looked_up = resolved[mapped_id]
+                if found:
+                    mapped[dim].extend(found)
                 else:
-                    ocx_tag = '{'+ f'{ns.get(mapped_id.split(':')[0],'')}' + '}' +f'{mapped_id.split(":")[1]}'
-                if ocx_tag in ocx_elements and not enum_type and len(tags) == 0:
-                    mapped[dim].append(ocx_tag)
-                elif ocx_tag in ocx_elements and enum_type and enum_type[0] in enumerations and enum_type[1] in enumerations[enum_type[0]].to_dict().get('Value', []):
-                    mapped[dim].append(ocx_tag)
-                elif len(tags) > 0:
-                    found = False
-                    for tag in tags:
-                        if tag in ocx_elements:
-                            mapped[dim].append(tag)
-                            found = True
-                    if not found:
-                        logger.warning(f'Node {node_id} ({source[node_id][TaxonomyFields.LABEL.value]}) mapping {tags} not found in target.')
-                        not_mapped[dim].append(node_id)
-                else:
-                    logger.warning(f'Node {node_id} ({source[node_id][TaxonomyFields.LABEL.value]}) mapping {ocx_tag} not found in target.')
+                    logger.warning(f'Node {node_id} ({node[_LABEL]}) mapping {looked_up} not found in target.')
                     not_mapped[dim].append(node_id)
             else:
                 not_mapped[dim].append(node_id)
-                logger.info(f'Node {node_id} ({source[node_id][TaxonomyFields.LABEL.value]}) has no mapping.')
+                logger.info('Node {} ({}) has no mapping.', node_id, node[_LABEL])
 
 # Create the report dict
     report = {}
@@ -435,12 +457,10 @@ def ocx_coverage_report(source:dict, target:Transformer, dimensions:List[str]) -
     total_mapped = 0
     total_not_mapped = 0
     for dim in dimensions:
-        not_mapped_children = ''
-        for child in not_mapped[dim]:
-            not_mapped_children += f'{child}, '
+        not_mapped_children = ', '.join(not_mapped[dim])
         report[dim] = {
             'Dimension' : f'{dim}',
-            'Label': source[dim][TaxonomyFields.LABEL.value],
+            'Label': source[dim][_LABEL],
             'Coverage %': f'{(len(mapped[dim]) / (len(mapped[dim]) + len(not_mapped[dim])) * 100):.1f}' if (len(
                 mapped[dim]) + len(not_mapped[dim])) > 0 else '0.0',
             'Total items': len(mapped[dim]) + len(not_mapped[dim]),
@@ -520,34 +540,27 @@ def doc_coverage_report(source:dict, target:dict, dimensions:List[str]) -> Tuple
     not_mapped = defaultdict(list)
     # Traverse all children of a dimension and collect mappings
     # Get all global OCX names
+    child_index = build_child_index(source)
     for dim in dimensions:
-        # Get all children of this dimension recursively
-        def get_children(node_id):
-            children = []
-            for child_id, child_data in source.items():
-                if child_data[TaxonomyFields.PARENT_ID.value] == node_id:
-                    children.append(child_id)
-                    children.extend(get_children(child_id))
-            return children
-
         # Get all nodes under this dimension
-        dimension_nodes = get_children(dim)
-        logger.debug(f'Found {len(dimension_nodes)} children for dimension {dim}.')
+        dimension_nodes = get_descendants(dim, child_index)
+        logger.debug('Found {} children for dimension {}.', len(dimension_nodes), dim)
         # dimension_nodes.append(dim)  # Include the dimension itself
 
         # Check mappings for all nodes under this dimension
         for node_id in dimension_nodes:
-            if source[node_id].get(TaxonomyFields.MAPPING.value):
-                mapped_id = source[node_id][TaxonomyFields.MAPPING.value]
+            node = source[node_id]
+            mapped_id = node.get(_MAPPING)
+            if mapped_id:
                 if mapped_id in target:
                     mapped[dim].append(node_id)
-                    logger.debug(f'Node {node_id} ({source[node_id][TaxonomyFields.LABEL.value]}) mapped to {mapped_id}.')
+                    logger.debug('Node {} ({}) mapped to {}.', node_id, node[_LABEL], mapped_id)
                 else:
-                    logger.warning(f'Node {node_id} ({source[node_id][TaxonomyFields.LABEL.value]}) mapping {mapped_id} not found in target.')
+                    logger.warning(f'Node {node_id} ({node[_LABEL]}) mapping {mapped_id} not found in target.')
                     not_mapped[dim].append(node_id)
             else:
                 not_mapped[dim].append(node_id)
-                logger.info(f'Node {node_id} ({source[node_id][TaxonomyFields.LABEL.value]}) has no mapping.')
+                logger.info('Node {} ({}) has no mapping.', node_id, node[_LABEL])
 
 # Create the report dict
     report = {}
@@ -555,11 +568,9 @@ def doc_coverage_report(source:dict, target:dict, dimensions:List[str]) -> Tuple
     total_mapped = 0
     total_not_mapped = 0
     for dim in dimensions:
-        not_mapped_children = ''
-        for child in not_mapped[dim]:
-            not_mapped_children += f'{child}:{source[child].get(TaxonomyFields.LABEL.value)}, '
+        not_mapped_children = ', '.join(f'{child}:{source[child].get(_LABEL)}' for child in not_mapped[dim])
         report[dim] = {
-            'Dimension' : f'{dim}:{source[dim][TaxonomyFields.LABEL.value]}',
+            'Dimension' : f'{dim}:{source[dim][_LABEL]}',
             'Coverage %': f'{(len(mapped[dim]) / (len(mapped[dim]) + len(not_mapped[dim])) * 100):.1f}' if (len(
                 mapped[dim]) + len(not_mapped[dim])) > 0 else '0.0',
             'Total items': len(mapped[dim]) + len(not_mapped[dim]),
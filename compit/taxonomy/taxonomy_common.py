@@ -1,4 +1,14 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import re
+import tempfile
 from enum import Enum
+from pathlib import Path
+
+from loguru import logger
 
 
 class ExcludeNodes(Enum):
@@ -13,17 +23,105 @@ class ExcludeAttributes(Enum):
     NUMERICVALUE = "numericvalue"
 
 
+# A capitalised word following any character, and a lower case letter or digit followed by a capital
+_CAMEL_WORD = re.compile('(.)([A-Z][a-z]+)')
+_CAMEL_BOUNDARY = re.compile('([a-z0-9])([A-Z])')
+
+
+@functools.lru_cache(maxsize=4096)
 def camel_to_snake(name: str) -> str:
     """Convert camel case to snake case."""
-    import re
-    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
-    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+    s1 = _CAMEL_WORD.sub(r'\1_\2', name)
+    return _CAMEL_BOUNDARY.sub(r'\1_\2', s1).lower()
 
+@functools.lru_cache(maxsize=4096)
 def camel_to_sentence(name: str) -> str:
     """Convert camel case to sentence case."""
-    import re
-    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1 \2', name)
-    return re.sub('([a-z0-9])([A-Z])', r'\1 \2', s1).capitalize()
+    s1 = _CAMEL_WORD.sub(r'\1 \2', name)
+    return _CAMEL_BOUNDARY.sub(r'\1 \2', s1).capitalize()
+
+def _normalise_paths(value):
+    """Return value with every Path, or str naming an existing file, replaced by its resolved Path."""
+    if isinstance(value, (str, os.PathLike)) and os.path.isfile(value):
+        return Path(value).resolve()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_normalise_paths(item) for item in value)
+    return value
+
+
+def _file_mtimes(value) -> list:
+    """Return the (path, mtime) pairs of all paths in value, which must be normalised by _normalise_paths."""
+    if isinstance(value, Path):
+        return [(str(value), value.stat().st_mtime)]
+    if isinstance(value, (list, tuple)):
+        return [mtime for item in value for mtime in _file_mtimes(item)]
+    return []
+
+
+# Version of the pickled results, increase when the shape of a cached result changes
+_CACHE_FORMAT = 2
+
+
+def disk_cache(cache_dir: str = "~/.cache/compit"):
+    """
+    Decorator to pickle the result of a function reading files to disk.
+
+    The cache key includes the function arguments, bound to the function signature, and the modification time of
+    all path arguments, so the cached result is discarded when a file changes. Writing a result removes the results
+    of the same call for older file versions. A cache file that cannot be read or written is treated as a cache miss.
+
+    The decorated function has an ``is_cached`` function taking the same arguments.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def cache_file_for(args, kwargs) -> Path:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = [(name, _normalise_paths(value)) for name, value in bound.arguments.items()]
+            call_key = repr((_CACHE_FORMAT, func.__module__, func.__qualname__, arguments))
+            mtimes_key = repr(_file_mtimes([value for _, value in arguments]))
+            # The call part of the name groups the results of the same call for different file versions
+            call_hash = hashlib.sha1(call_key.encode()).hexdigest()
+            mtimes_hash = hashlib.sha1(mtimes_key.encode()).hexdigest()
+            return Path(cache_dir).expanduser() / f'{call_hash}-{mtimes_hash}.pkl'
+
+        def is_cached(*args, **kwargs) -> bool:
+            return cache_file_for(args, kwargs).exists()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_file = cache_file_for(args, kwargs)
+            if cache_file.exists():
+                try:
+                    with open(cache_file, 'rb') as f:
+                        return pickle.load(f)
+                except Exception as e:
+                    logger.warning("Ignoring unreadable cache file {}: {}", cache_file, e)
+            result = func(*args, **kwargs)
+            tmp_name = None
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a temporary file and move it into place, so readers never see a partial pickle
+                with tempfile.NamedTemporaryFile('wb', dir=cache_file.parent, suffix='.tmp', delete=False) as f:
+                    tmp_name = f.name
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_name, cache_file)
+                # Remove the results of this call for older versions of its files
+                call_hash = cache_file.name.split('-')[0]
+                for stale in cache_file.parent.glob(f'{call_hash}-*.pkl'):
+                    if stale != cache_file:
+                        stale.unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning("Could not write cache file {}: {}", cache_file, e)
+                if tmp_name is not None and os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+            return result
+
+        wrapper.is_cached = is_cached
+        return wrapper
+    return decorator
+
 
 class RenderEngine(Enum):
     """
@@ -45,6 +143,23 @@ class RancDir(Enum):
     RL = "RL"  # Right to Left
 
 
+class ReportFormat(Enum):
+    """
+    Enum for coverage report file formats.
+    """
+    XLSX = "xlsx"
+    PARQUET = "parquet"  # Requires pyarrow
+
+
+class MappingKind(Enum):
+    """
+    Enum for the kinds of OCX mappings in the taxonomy.
+    """
+    ELEMENT = "element"  # prefix:Element
+    ENUMERATION = "enumeration"  # prefix:Element@enumType#value
+    SUBSTITUTION = "substitution"  # prefix:Element=[prefix:Sub1, prefix:Sub2]
+
+
 class AttributeFields(Enum):
     """
     Enum for attribute fields.
@@ -1,6 +1,7 @@
 """Taxonomy validations"""
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from taxonomy.load_taxonomy import get_excel_cell_ref
@@ -17,8 +18,6 @@ def validate_taxonomy(excel_path: Path, sheet_name: str = 'taxonomy', spell_chec
     """
     Validate taxonomy structure including all required fields.
     """
-    ids = set()
-    parents = {}
     errors = []
     try:
         from spellchecker import SpellChecker
@@ -30,33 +29,43 @@ def validate_taxonomy(excel_path: Path, sheet_name: str = 'taxonomy', spell_chec
                 "pyspellchecker not installed. Install with 'pip install pyspellchecker' or set skip_spell_check=True")
             return errors
     try:
-        # Read Excel file
-        df = pd.read_excel(excel_path, sheet_name=sheet_name)
+        # Read Excel file, only the taxonomy columns and the validated ones as strings
+        required_fields = [field.value for field in TaxonomyFields]
+        string_fields = [TaxonomyFields.ID.value, TaxonomyFields.PARENT_ID.value, TaxonomyFields.DESCRIPTION.value]
+        df = pd.read_excel(excel_path, sheet_name=sheet_name, usecols=lambda column: column in required_fields,
+                           dtype={field: 'string' for field in string_fields})
 
         # Check required columns
-        required_fields = [field.value for field in TaxonomyFields]
         missing_fields = set(required_fields) - set(df.columns)
         if missing_fields:
+            found_columns = pd.read_excel(excel_path, sheet_name=sheet_name, nrows=0).columns
             errors.append(f"Missing required columns in header: {', '.join(missing_fields)}")
-            errors.append(f"Found columns: {', '.join(df.columns)}")
+            errors.append(f"Found columns: {', '.join(found_columns)}")
             return errors
 
-        # Validate rows
-        for index, row in df.iterrows():
-            excel_row = index + 2  # Excel row numbers start at 1, and we have a header
+        # Spell check the distinct words of all descriptions at once, the rows then only look up the unknown words
+        unknown_words = set()
+        if spell_check:
+            descriptions = df[TaxonomyFields.DESCRIPTION.value].dropna().astype(str)
+            candidates = {word.strip('.,()') for description in descriptions for word in description.split()}
+            unknown_words = {word for word in candidates if not spell[word]}
 
+        # Validate rows, reading the columns as arrays to avoid building a Series per row
+        rows = zip(df[TaxonomyFields.ID.value].to_numpy(), df[TaxonomyFields.DESCRIPTION.value].to_numpy())
+        # Excel row numbers start at 1, and we have a header
+        for excel_row, (raw_id, raw_description) in enumerate(rows, start=2):
             try:
                 # Check for empty required fields
-                if pd.isna(row[TaxonomyFields.ID.value]):
+                if pd.isna(raw_id):
                     errors.append(f"Empty value for required field !r{TaxonomyFields.ID.value} at "
                                   f"{get_excel_cell_ref(excel_row, TaxonomyFields.ID.value)}")
                     continue
 
                 # Spell check description if available and spell checking is enabled
-                if spell_check and pd.notna(row[TaxonomyFields.DESCRIPTION.value]):
-                    description = str(row[TaxonomyFields.DESCRIPTION.value])
+                if spell_check and pd.notna(raw_description):
+                    description = str(raw_description)
                     misspelled = [word for word in description.split()
-                                  if not spell[word.strip('.,()')]and not word.isnumeric() and not word.isupper()
+                                  if word.strip('.,()') in unknown_words and not word.isnumeric() and not word.isupper()
                                   #and not word.isdigit() and not word.isalpha()
                                   and '_' not in word and '%' not in word and '-' not in word and '/' not in word
                                   and '=' not in word and '+' not in word and '#' not in word and '&' not in word]
@@ -64,45 +73,46 @@ def validate_taxonomy(excel_path: Path, sheet_name: str = 'taxonomy', spell_chec
                         errors.append(f"Possible spelling errors in description at "
                                       f"{get_excel_cell_ref(excel_row, TaxonomyFields.DESCRIPTION.value)}: "
                                       f"{', '.join(misspelled)}")
-                # Normalize IDs by removing leading/trailing spaces
-                row_id = str(row[TaxonomyFields.ID.value]).strip()
-                parent_id = str(row[TaxonomyFields.PARENT_ID.value]).strip() \
-                    if (pd.notna(row[TaxonomyFields.PARENT_ID.value])
-                        and row[TaxonomyFields.PARENT_ID.value] != '') else None
-
-                # Skip validation for empty parent IDs (root nodes)
-                if parent_id == '':
-                    parent_id = None
-
-                if row_id in ids:
-                    errors.append(
-                        f"Duplicate ID '{row_id}' found at {get_excel_cell_ref(excel_row, TaxonomyFields.PARENT_ID.value)}")
-                ids.add(row_id)
-                parents[row_id] = parent_id
-
             except Exception as e:
                 errors.append(f"Error reading row {excel_row}: {str(e)}")
                 continue
 
+        # Normalize IDs by removing leading/trailing spaces, rows without an ID are reported above
+        has_id = df[TaxonomyFields.ID.value].notna().to_numpy()
+        row_ids = df[TaxonomyFields.ID.value][has_id].astype(str).str.strip()
+        raw_parent_ids = df[TaxonomyFields.PARENT_ID.value][has_id]
+        parent_ids = raw_parent_ids.astype(str).str.strip().astype(object)
+        # Skip validation for empty parent IDs (root nodes)
+        parent_ids = parent_ids.where(raw_parent_ids.notna() & (raw_parent_ids != '') & (parent_ids != ''), None)
+
+        is_duplicate = row_ids.duplicated(keep='first').to_numpy()
+        for excel_row, row_id in zip(np.flatnonzero(has_id)[is_duplicate] + 2, row_ids[is_duplicate]):
+            errors.append(
+                f"Duplicate ID '{row_id}' found at {get_excel_cell_ref(excel_row, TaxonomyFields.PARENT_ID.value)}")
+        ids = set(row_ids)
+        parents = dict(zip(row_ids, parent_ids))
+
         # Validation of structure
         if not errors:
             # Check for missing parents (only for non-root nodes)
-            for child_id, parent_id in parents.items():
-                if parent_id and parent_id not in ids:
-                    errors.append(f"ID '{child_id}' references missing parent '{parent_id}'")
+            is_missing = (parent_ids.notna() & ~parent_ids.isin(ids)).to_numpy()
+            for child_id, parent_id in zip(row_ids[is_missing], parent_ids[is_missing]):
+                errors.append(f"ID '{child_id}' references missing parent '{parent_id}'")
+
+            # Detect cycles by walking each parent chain once. A node maps to whether its chain runs into a cycle,
+            # or to None while it is on the chain being walked
+            in_cycle = {}
 
-            # Detect cycles using a path-tracking approach
-            def has_cycle(node_id, path=None):
-                if path is None:
-                    path = set()
-                if node_id in path:
-                    return True
-                path.add(node_id)
-                parent_id = parents.get(node_id)
-                if parent_id is None:
-                    return False
-                result = has_cycle(parent_id, path)
-                path.remove(node_id)
+            def has_cycle(node_id):
+                path = []
+                while node_id is not None and node_id not in in_cycle:
+                    in_cycle[node_id] = None
+                    path.append(node_id)
+                    node_id = parents.get(node_id)
+                # Reaching a node of the current chain again closes a cycle
+                result = node_id is not None and in_cycle[node_id] is not False
+                for visited in path:
+                    in_cycle[visited] = result
                 return result
 
             # Check each node for cycles
@@ -0,0 +1,59 @@
+"""Tests for loading and printing taxonomies."""
+import pandas as pd
+
+from taxonomy.load_taxonomy import load_multiple_graphs, load_taxonomy, print_taxonomy
+from taxonomy.taxonomy_common import AttributeFields, TaxonomyFields
+
+
+def node(parent_id, doc_type=None):
+    return {'parent_id': parent_id, 'label': 'label', 'doc_type': doc_type}
+
+
+def test_print_taxonomy_with_parent_cycle(capsys):
+    # x and y are each other's parent, so they are not reachable from a root
+    taxonomy = {'r1': node(None), 'c1': node('r1', 'Drawing'), 'x': node('y', 'Drawing'), 'y': node('x')}
+    print_taxonomy(taxonomy, doc_type_filter='Drawing')
+    output = capsys.readouterr().out
+    assert 'r1' in output and 'c1' in output
+    assert 'x:' not in output and 'y:' not in output
+
+
+def test_print_taxonomy_filter_below_max_depth(capsys):
+    # The only matches are below the roots, which are not shown with max_depth 1
+    taxonomy = {'r1': node(None), 'r2': node(None), 'c1': node('r1', 'Drawing'), 'c2': node('r2', 'Drawing')}
+    print_taxonomy(taxonomy, doc_type_filter='Drawing', max_depth=1)
+    assert 'No matching nodes found' in capsys.readouterr().out
+
+
+def test_print_taxonomy_filter_within_max_depth(capsys):
+    taxonomy = {'r1': node(None), 'r2': node(None), 'c1': node('r1', 'Drawing'), 'g2': node('c1', 'Drawing'),
+                'c2': node('r2'), 'g3': node('c2', 'Drawing')}
+    print_taxonomy(taxonomy, doc_type_filter='Drawing', max_depth=2)
+    output = capsys.readouterr().out
+    assert 'r1' in output and 'c1' in output
+    assert 'r2' not in output and 'g3' not in output
+
+
+def write_workbook(path, prefix):
+    nodes = pd.DataFrame([{field.value: f'{prefix}{i}' for field in TaxonomyFields} for i in range(5)])
+    nodes[TaxonomyFields.PARENT_ID.value] = [None] + [f'{prefix}{i // 2}' for i in range(4)]
+    attributes = pd.DataFrame([{AttributeFields.ID.value: f'{prefix}1', AttributeFields.ATTRIBUTE_NAME.value: 'name',
+                                AttributeFields.DESCRIPTION.value: 'text', AttributeFields.REQUIRED.value: True,
+                                AttributeFields.DATA_TYPE.value: 'xs:string', AttributeFields.OCX_NAME.value: 'x'}])
+    with pd.ExcelWriter(path) as writer:
+        nodes.to_excel(writer, sheet_name='taxonomy', index=False)
+        attributes.to_excel(writer, sheet_name='attributes', index=False)
+
+
+def test_load_multiple_graphs_matches_serial_load(tmp_path, monkeypatch):
+    # Keep the disk cache of the test out of the user's home
+    monkeypatch.setenv('HOME', str(tmp_path))
+    files = [tmp_path / 'a.xlsx', tmp_path / 'b.xlsx', tmp_path / 'c.xlsx']
+    for i, path in enumerate(files):
+        write_workbook(path, f'n{i}_')
+    files.append(files[0])
+    sub_graphs = [None, 'n1_1', None, 'n0_2']
+    serial = [load_taxonomy.__wrapped__(path, 'taxonomy', sub_graph) for path, sub_graph in zip(files, sub_graphs)]
+    # Parsed in worker processes, then again from the warm cache
+    assert load_multiple_graphs(files, sub_graphs=sub_graphs) == serial
+    assert load_multiple_graphs(files, sub_graphs=sub_graphs) == serial
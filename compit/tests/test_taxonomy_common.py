@@ -0,0 +1,67 @@
+"""Tests for the common taxonomy helpers."""
+import os
+
+from taxonomy.taxonomy_common import disk_cache
+
+
+def make_cached(cache_dir, calls):
+    @disk_cache(str(cache_dir))
+    def read_file(path, mode='text'):
+        calls.append(path)
+        with open(path) as f:
+            return f.read()
+    return read_file
+
+
+def test_disk_cache_invalidated_when_str_path_changes(tmp_path):
+    calls = []
+    read_file = make_cached(tmp_path / 'cache', calls)
+    data_file = tmp_path / 'data.txt'
+    data_file.write_text('first')
+    assert read_file(str(data_file)) == 'first'
+    assert read_file(str(data_file)) == 'first'
+    assert len(calls) == 1
+    data_file.write_text('second')
+    os.utime(data_file, (1, 1))
+    assert read_file(str(data_file)) == 'second'
+    assert len(calls) == 2
+
+
+def test_disk_cache_positional_and_keyword_calls_share_entry(tmp_path):
+    calls = []
+    read_file = make_cached(tmp_path / 'cache', calls)
+    data_file = tmp_path / 'data.txt'
+    data_file.write_text('first')
+    read_file(data_file)
+    assert read_file.is_cached(path=str(data_file), mode='text')
+    assert read_file(path=data_file, mode='text') == 'first'
+    assert read_file(str(data_file), 'text') == 'first'
+    assert len(calls) == 1
+
+
+def test_disk_cache_removes_results_of_older_file_versions(tmp_path):
+    calls = []
+    cache_dir = tmp_path / 'cache'
+    read_file = make_cached(cache_dir, calls)
+    data_file = tmp_path / 'data.txt'
+    data_file.write_text('first')
+    read_file(data_file)
+    read_file(data_file, mode='other')
+    data_file.write_text('second')
+    os.utime(data_file, (1, 1))
+    read_file(data_file)
+    # The old version of the first call is replaced, the other call is kept
+    assert len(list(cache_dir.glob('*.pkl'))) == 2
+
+
+def test_disk_cache_ignores_truncated_file(tmp_path):
+    calls = []
+    cache_dir = tmp_path / 'cache'
+    read_file = make_cached(cache_dir, calls)
+    data_file = tmp_path / 'data.txt'
+    data_file.write_text('first')
+    read_file(data_file)
+    for cache_file in cache_dir.glob('*.pkl'):
+        cache_file.write_bytes(b'\x80\x05')
+    assert read_file(data_file) == 'first'
+    assert len(calls) == 2
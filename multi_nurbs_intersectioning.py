@@ -1,6 +1,8 @@
 # Retry: simplified run (smaller sample sizes) of the pipeline using geomdl NURBS trim if available,
 # otherwise use emulated trim. This version reduces sampling/resolution to avoid timeouts.
 # Refer to ChatGPT Common error norms chat
+import functools
+from math import comb, hypot
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
@@ -14,15 +16,37 @@ except Exception as e:
     use_geomdl = False
 
 def bernstein_poly(i, n, t):
-    from math import comb
     return comb(n, i) * (t**i) * ((1 - t)**(n - i))
 
+def bernstein_basis(n, t, binomials=None):
+    # All n+1 Bernstein polynomials of degree n at t in one array expression, along a last axis if t is an array
+    i = np.arange(n + 1)
+    t = np.asarray(t, dtype=float)[..., None]
+    if binomials is None:
+        binomials = np.array([comb(n, k) for k in i], dtype=float)
+    return binomials * (t**i) * ((1 - t)**(n - i))
+
+def bernstein_basis_derivative(n, t):
+    # dB_i,n/dt = n * (B_i-1,n-1 - B_i,n-1), with the out of range terms taken as zero
+    if n == 0:
+        return np.zeros(np.shape(t) + (1,))
+    lower = bernstein_basis(n - 1, t)
+    pad = [(0, 0)] * (lower.ndim - 1)
+    return n * (np.pad(lower, pad + [(1, 0)]) - np.pad(lower, pad + [(0, 1)]))
+
+@functools.lru_cache(maxsize=4096)
+def _bernstein_vec(n, t):
+    # Basis at a scalar t, cached as the same degree and parameters recur across patches. Read only as it is shared
+    basis = bernstein_basis(n, t)
+    basis.flags.writeable = False
+    return basis
+
 def make_bezier_surface(ctrlpts):
     ctrlpts = np.asarray(ctrlpts)
-    m, n = np.array(ctrlpts.shape[:2]) - 1
+    m, n = (int(k) - 1 for k in ctrlpts.shape[:2])
     def surface_eval(u, v):
-        B_u = np.array([bernstein_poly(i, m, u) for i in range(m + 1)])
-        B_v = np.array([bernstein_poly(j, n, v) for j in range(n + 1)])
+        B_u = _bernstein_vec(m, float(u))
+        B_v = _bernstein_vec(n, float(v))
         return np.tensordot(B_u, np.tensordot(B_v, ctrlpts, (0, 1)), (0, 0))
     return surface_eval
 
@@ -36,6 +60,7 @@ class MultiBezierSurface:
         self.py = (ny - 1) // self.step
         self.patches = []
         self.idx_by_coord = {}
+        patch_ctrls = []
         for pi in range(self.px):
             for pj in range(self.py):
                 i = pi * self.step
@@ -45,10 +70,37 @@ class MultiBezierSurface:
                 patch_index = len(self.patches)
                 self.patches.append(((pi, pj), (surf, None, None)))
                 self.idx_by_coord[(pi, pj)] = patch_index
+                patch_ctrls.append(patch_ctrl)
+        # Control points of all patches in one array indexed by patch index, for batched evaluation
+        self.patch_ctrl = np.array(patch_ctrls, dtype=float).reshape(-1, patch_size, patch_size, 3)
+        self.binomials = np.array([comb(self.step, i) for i in range(patch_size)], dtype=float)
     def patch_from_coord(self, pi, pj):
         return self.idx_by_coord.get((pi, pj), None)
     def eval_patch(self, idx, u, v):
         return self.patches[idx][1][0](u, v)
+    def eval_patch_with_deriv(self, idx, u, v):
+        # Point and first partial derivatives of one patch, from the analytic Bernstein derivatives
+        ctrl = self.patch_ctrl[idx]
+        B_u = bernstein_basis(self.step, u, self.binomials); dB_u = bernstein_basis_derivative(self.step, u)
+        B_v = bernstein_basis(self.step, v, self.binomials); dB_v = bernstein_basis_derivative(self.step, v)
+        P = np.einsum('i,j,ijk->k', B_u, B_v, ctrl)
+        dP_du = np.einsum('i,j,ijk->k', dB_u, B_v, ctrl)
+        dP_dv = np.einsum('i,j,ijk->k', B_u, dB_v, ctrl)
+        return P, dP_du, dP_dv
+    def eval_patches(self, patch_ids, u, v):
+        # Evaluate patch patch_ids[k] at (u[k], v[k]) for all k at once
+        B_u = bernstein_basis(self.step, u, self.binomials)
+        B_v = bernstein_basis(self.step, v, self.binomials)
+        return np.einsum('pi,pj,pijk->pk', B_u, B_v, self.patch_ctrl[patch_ids])
+    def eval_global(self, U, V):
+        # Evaluate global (U, V) points, the integer part selects the patch. Points outside all patches are NaN
+        U = np.asarray(U, dtype=float); V = np.asarray(V, dtype=float)
+        pi = np.floor(U).astype(int); pj = np.floor(V).astype(int)
+        u_local = np.clip(U - pi, 0.0, 1.0); v_local = np.clip(V - pj, 0.0, 1.0)
+        valid = (pi >= 0) & (pi < self.px) & (pj >= 0) & (pj < self.py)
+        pts = np.full((len(U), 3), np.nan)
+        pts[valid] = self.eval_patches(pi[valid] * self.py + pj[valid], u_local[valid], v_local[valid])
+        return pts
 
 class GlobalUVSpline:
     def __init__(self, uv_curve, geomdl_surface=None):
@@ -59,20 +111,27 @@ class GlobalUVSpline:
             self.uv_pts = np.asarray(uv_curve, dtype=float)
             if self.uv_pts.ndim != 2 or self.uv_pts.shape[1] != 2:
                 raise ValueError("uv_curve array must be shape (N,2)")
+            # The interpolated curve is piecewise linear with uniform parameter spans
+            self.seg_t = np.linspace(0.0, 1.0, len(self.uv_pts))
+            self.seg_dx = np.diff(self.uv_pts, axis=0)
+    def _span(self, t_arr):
+        # Span index and local parameter of each t, parameters outside [0, 1] are clamped as in np.interp
+        n = len(self.uv_pts)
+        t_arr = np.clip(np.asarray(t_arr, dtype=float), 0.0, 1.0)
+        idx = np.clip(np.searchsorted(self.seg_t, t_arr, side='right') - 1, 0, n - 2)
+        return idx, (t_arr - self.seg_t[idx]) * (n - 1)
     def evaluate_uv(self, t):
         scalar = np.isscalar(t) or (isinstance(t, np.ndarray) and t.ndim == 0)
         t_arr = np.atleast_1d(t)
         if self._is_geomdl_uv:
-            out = np.array([self.uv_curve.evaluate_single(float(tt)) for tt in t_arr])
+            out = np.asarray(self.uv_curve.evaluate_list(t_arr.astype(float).tolist()), dtype=float)
         else:
             n = len(self.uv_pts)
             if n == 1:
                 out = np.tile(self.uv_pts[0], (len(t_arr), 1))
             else:
-                u_ctrl = np.linspace(0.0, 1.0, n)
-                U = np.interp(t_arr, u_ctrl, self.uv_pts[:, 0])
-                V = np.interp(t_arr, u_ctrl, self.uv_pts[:, 1])
-                out = np.column_stack((U, V))
+                idx, alpha = self._span(t_arr)
+                out = self.uv_pts[idx] + alpha[:, None] * self.seg_dx[idx]
         return out[0] if scalar else out
     def derivative_uv(self, t):
         t = float(t)
@@ -81,129 +140,145 @@ class GlobalUVSpline:
             duv = np.array(derivs[1], dtype=float)
             return duv.reshape(2,)
         else:
-            h = 1e-6
-            t0 = max(0.0, t - h); t1 = min(1.0, t + h)
-            p0 = np.asarray(self.evaluate_uv(t0)).reshape(2,)
-            p1 = np.asarray(self.evaluate_uv(t1)).reshape(2,)
-            return (p1 - p0) / (t1 - t0)
+            # The derivative of the piecewise linear curve is the slope of the span containing t
+            n = len(self.uv_pts)
+            if n == 1:
+                return np.zeros(2)
+            idx, _ = self._span(t)
+            return self.seg_dx[idx] * (n - 1)
     def evaluate3D(self, t, multi_surf):
         uv = self.evaluate_uv(t)
         arr = np.atleast_2d(uv)
-        pts = []
-        for Ux, Vx in arr:
-            pi = int(np.floor(Ux)); pj = int(np.floor(Vx))
-            u_local = float(np.clip(Ux - pi, 0.0, 1.0)); v_local = float(np.clip(Vx - pj, 0.0, 1.0))
-            pidx = multi_surf.patch_from_coord(pi, pj)
-            if pidx is None:
-                pts.append([np.nan, np.nan, np.nan])
-            else:
-                pts.append(multi_surf.eval_patch(pidx, u_local, v_local))
-        return pts[0] if np.isscalar(t) else np.array(pts)
+        pts = multi_surf.eval_global(arr[:, 0], arr[:, 1])
+        return pts[0] if np.isscalar(t) else pts
     def derivative3D(self, t, multi_surf):
-        h = 1e-6
-        P0 = np.asarray(self.evaluate3D(max(0.0, t-h), multi_surf)).reshape(3,)
-        P1 = np.asarray(self.evaluate3D(min(1.0, t+h), multi_surf)).reshape(3,)
-        return (P1 - P0) / (2*h)
+        # Chain rule dS/dt = dS/du * du/dt + dS/dv * dv/dt on the patch containing the curve point
+        Ux, Vx = self.evaluate_uv(t)
+        dU, dV = self.derivative_uv(t)
+        pi = int(np.floor(Ux)); pj = int(np.floor(Vx))
+        pidx = multi_surf.patch_from_coord(pi, pj)
+        if pidx is None:
+            return np.full(3, np.nan)
+        u_local = float(np.clip(Ux - pi, 0.0, 1.0)); v_local = float(np.clip(Vx - pj, 0.0, 1.0))
+        _, dP_du, dP_dv = multi_surf.eval_patch_with_deriv(pidx, u_local, v_local)
+        return dP_du * dU + dP_dv * dV
 
 def sample_parametric_curve(curve_func, n=200):
+    # curve_func is a function of s, or a curve object whose evaluate_list evaluates all samples in one call
     s = np.linspace(0.0, 1.0, n)
-    pts = np.array([curve_func(si) for si in s])
+    if hasattr(curve_func, "evaluate_list"):
+        pts = np.asarray(curve_func.evaluate_list(s.tolist()), dtype=float)
+    else:
+        pts = np.array([curve_func(si) for si in s])
     return s, pts
 
 def segment_intersection_2d(p1, p2, q1, q2):
-    p = np.array(p1); r = np.array(p2) - p
-    q = np.array(q1); s = np.array(q2) - q
-    r_cross_s = r[0]*s[1] - r[1]*s[0]
+    # Plain float arithmetic on the unpacked coordinates, no arrays are built per call
+    px, py = p1[0], p1[1]; rx, ry = p2[0] - px, p2[1] - py
+    qx, qy = q1[0], q1[1]; sx, sy = q2[0] - qx, q2[1] - qy
+    r_cross_s = rx*sy - ry*sx
     if abs(r_cross_s) < 1e-12:
         return None
-    q_p = q - p
-    t = (q_p[0]*s[1] - q_p[1]*s[0]) / r_cross_s
-    u = (q_p[0]*r[1] - q_p[1]*r[0]) / r_cross_s
+    qpx, qpy = qx - px, qy - py
+    t = (qpx*sy - qpy*sx) / r_cross_s
+    u = (qpx*ry - qpy*rx) / r_cross_s
     if 0.0 <= t <= 1.0 and 0.0 <= u <= 1.0:
         return float(t), float(u)
     return None
 
 def point_in_polygon(pt, poly):
+    # Ray casting over all polygon edges at once, the point is inside if the ray crosses an odd number of edges
     x, y = pt
-    inside = False
-    n = len(poly)
-    for i in range(n):
-        x0, y0 = poly[i]; x1, y1 = poly[(i+1)%n]
-        if ((y0 > y) != (y1 > y)) and (x < (x1 - x0) * (y - y0) / (y1 - y0 + 1e-30) + x0):
-            inside = not inside
-    return inside
+    poly = np.asarray(poly, dtype=float)
+    x0, y0 = poly[:, 0], poly[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crosses = ((y0 > y) != (y1 > y)) & (x < (x1 - x0) * (y - y0) / (y1 - y0 + 1e-30) + x0)
+    return bool(np.count_nonzero(crosses) % 2)
 
 def refine_intersection_analytic(spline_uv: GlobalUVSpline, trim_curve, t0, s0, tol=1e-9, max_iter=25):
+    # Newton iteration on P(t) - Q(s) = 0 in scalars, the 2x2 system is solved in closed form by Cramer's rule
+    def residual(t, s):
+        Px, Py = spline_uv.evaluate_uv(t)
+        Qx, Qy = trim_curve.evaluate_single(s)
+        return float(Px - Qx), float(Py - Qy)
     t = float(np.clip(t0, 0.0, 1.0)); s = float(np.clip(s0, 0.0, 1.0))
     for _ in range(max_iter):
-        P = np.asarray(spline_uv.evaluate_uv(t)).reshape(2,)
-        Q = np.asarray(trim_curve.evaluate_single(s)).reshape(2,)
-        F = P - Q
-        res = np.linalg.norm(F)
+        Fx, Fy = residual(t, s)
+        res = hypot(Fx, Fy)
         if res < tol:
             return t, s, True, res
-        dP_dt = np.asarray(spline_uv.derivative_uv(t)).reshape(2,)
-        derivs = trim_curve.derivatives(s, order=1)
-        dQ_ds = np.asarray(derivs[1], dtype=float).reshape(2,)
-        J = np.column_stack((dP_dt, -dQ_ds))
-        try:
-            delta = np.linalg.solve(J, -F)
-        except np.linalg.LinAlgError:
+        dPx, dPy = spline_uv.derivative_uv(t)
+        dQx, dQy = trim_curve.derivatives(s, order=1)[1]
+        # J = [[dPx, -dQx], [dPy, -dQy]], solve J * delta = -F
+        det = dQx*dPy - dPx*dQy
+        if det == 0.0:
             return t, s, False, res
-        t += float(delta[0]); s += float(delta[1])
-        t = float(np.clip(t, 0.0, 1.0)); s = float(np.clip(s, 0.0, 1.0))
-        if np.linalg.norm(delta) < tol:
-            P_final = np.asarray(spline_uv.evaluate_uv(t)).reshape(2,)
-            Q_final = np.asarray(trim_curve.evaluate_single(s)).reshape(2,)
-            return t, s, True, np.linalg.norm(P_final - Q_final)
-    P_final = np.asarray(spline_uv.evaluate_uv(t)).reshape(2,)
-    Q_final = np.asarray(trim_curve.evaluate_single(s)).reshape(2,)
-    return t, s, np.linalg.norm(P_final - Q_final) < tol, np.linalg.norm(P_final - Q_final)
+        dt = float((Fx*dQy - dQx*Fy) / det); ds = float((dPy*Fx - dPx*Fy) / det)
+        t = float(np.clip(t + dt, 0.0, 1.0)); s = float(np.clip(s + ds, 0.0, 1.0))
+        if hypot(dt, ds) < tol:
+            return t, s, True, hypot(*residual(t, s))
+    err = hypot(*residual(t, s))
+    return t, s, err < tol, err
 
 def clip_spline_by_geomdl_trim(spline_uv, trim_curve, multi_surf,
                                n_spline_samples=200, n_trim_samples=200,
                                refine_tol=1e-9, sample_per_segment=80):
     ts = np.linspace(0,1,n_spline_samples+1); spine = spline_uv.evaluate_uv(ts)
-    ss, trim_pts = sample_parametric_curve(lambda s: trim_curve.evaluate_single(s), n=n_trim_samples+1)
+    trim_source = trim_curve if hasattr(trim_curve, "evaluate_list") else trim_curve.evaluate_single
+    ss, trim_pts = sample_parametric_curve(trim_source, n=n_trim_samples+1)
+    # Only segments with overlapping y ranges can intersect. With the spine segments sorted by their lower y, the
+    # candidates of a trim segment are a window of that order found by binary search, widened by the tallest segment
+    P = spine[:, :2]; Q = trim_pts[:, :2]
+    spine_ymin = np.minimum(P[:-1, 1], P[1:, 1]); spine_ymax = np.maximum(P[:-1, 1], P[1:, 1])
+    trim_ymin = np.minimum(Q[:-1, 1], Q[1:, 1]); trim_ymax = np.maximum(Q[:-1, 1], Q[1:, 1])
+    by_ymin = np.argsort(spine_ymin, kind='stable')
+    lo = np.searchsorted(spine_ymin[by_ymin], trim_ymin - np.max(spine_ymax - spine_ymin), side='left')
+    hi = np.searchsorted(spine_ymin[by_ymin], trim_ymax, side='right')
+    counts = np.maximum(hi - lo, 0)
+    j = np.repeat(np.arange(len(counts)), counts)
+    i = by_ymin[np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+    overlap = spine_ymax[i] >= trim_ymin[j]
+    i, j = i[overlap], j[overlap]
+    # Intersect the candidate pairs at once, as in segment_intersection_2d on arrays
+    p = P[i]; r = P[i+1] - p
+    q = Q[j]; s = Q[j+1] - q
+    r_cross_s = r[:, 0]*s[:, 1] - r[:, 1]*s[:, 0]
+    q_p = q - p
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_hit = (q_p[:, 0]*s[:, 1] - q_p[:, 1]*s[:, 0]) / r_cross_s
+        u_hit = (q_p[:, 0]*r[:, 1] - q_p[:, 1]*r[:, 0]) / r_cross_s
+    hits = (np.abs(r_cross_s) >= 1e-12) & (0.0 <= t_hit) & (t_hit <= 1.0) & (0.0 <= u_hit) & (u_hit <= 1.0)
+    hits = np.flatnonzero(hits)
+    hits = hits[np.lexsort((j[hits], i[hits]))]
     intersections = []
-    for i in range(len(spine)-1):
-        p1 = spine[i]; p2 = spine[i+1]
-        for j in range(len(trim_pts)-1):
-            q1 = trim_pts[j]; q2 = trim_pts[j+1]
-            res = segment_intersection_2d(p1[:2], p2[:2], q1[:2], q2[:2])
-            if res is not None:
-                t_local, u_local = res
-                t_init = ts[i] + t_local*(ts[i+1]-ts[i])
-                s_init = ss[j] + u_local*(ss[j+1]-ss[j])
-                t_ref, s_ref, ok, err = refine_intersection_analytic(spline_uv, trim_curve, t_init, s_init, tol=refine_tol)
-                intersections.append((t_ref, s_ref, ok, err))
-    intersections = sorted(intersections, key=lambda x: x[0])
-    clustered = []
-    for item in intersections:
-        if not clustered:
-            clustered.append(item)
-        else:
-            if abs(item[0] - clustered[-1][0]) < 1e-6:
-                if item[3] < clustered[-1][3]:
-                    clustered[-1] = item
-            else:
-                clustered.append(item)
-    intersections = clustered
+    for k in hits:
+        t_init = ts[i[k]] + t_hit[k]*(ts[i[k]+1]-ts[i[k]])
+        s_init = ss[j[k]] + u_hit[k]*(ss[j[k]+1]-ss[j[k]])
+        t_ref, s_ref, ok, err = refine_intersection_analytic(spline_uv, trim_curve, t_init, s_init, tol=refine_tol)
+        intersections.append((t_ref, s_ref, ok, err))
+    # Intersections less than 1e-6 apart in t form one cluster, keep the one with the smallest error in each
+    if intersections:
+        t_err = np.array([(t, err) for (t, s, ok, err) in intersections], dtype=float)
+        by_t = np.argsort(t_err[:, 0], kind='stable')
+        cluster = np.concatenate(([0], np.cumsum(np.diff(t_err[by_t, 0]) >= 1e-6)))
+        order = np.lexsort((t_err[by_t, 1], cluster))
+        _, first = np.unique(cluster[order], return_index=True)
+        intersections = [intersections[k] for k in by_t[order[first]]]
     t_vals = [0.0] + [t for (t, s, ok, err) in intersections] + [1.0]
     t_vals = sorted(list(set([float(max(0.0,min(1.0,t))) for t in t_vals])))
+    # Evaluate the midpoints of all candidate segments in one call, then the samples of all inside segments in one call
+    spans = [(a, b) for a, b in zip(t_vals[:-1], t_vals[1:]) if b - a >= 1e-12]
+    mids = spline_uv.evaluate_uv(np.array([0.5*(a+b) for a, b in spans]).reshape(-1))
+    spans = [(a, b) for (a, b), mid_uv in zip(spans, mids) if point_in_polygon(mid_uv, trim_pts[:, :2])]
     segments = []
-    for k in range(len(t_vals)-1):
-        a = t_vals[k]; b = t_vals[k+1]
-        if b - a < 1e-12:
-            continue
-        mid = 0.5*(a+b)
-        Umid, Vmid = spline_uv.evaluate_uv(mid)
-        inside = point_in_polygon((Umid, Vmid), trim_pts[:, :2])
-        if inside:
-            seg_t = np.linspace(a, b, sample_per_segment)
-            seg_uv = spline_uv.evaluate_uv(seg_t)
-            seg_pts3d = spline_uv.evaluate3D(seg_t, multi_surf)
-            segments.append({'t0':a, 't1':b, 't':seg_t, 'UV':seg_uv, 'pts3d':seg_pts3d})
+    if spans:
+        seg_ts = [np.linspace(a, b, sample_per_segment) for a, b in spans]
+        all_uv = spline_uv.evaluate_uv(np.concatenate(seg_ts))
+        all_pts3d = multi_surf.eval_global(all_uv[:, 0], all_uv[:, 1])
+        for k, ((a, b), seg_t) in enumerate(zip(spans, seg_ts)):
+            rows = slice(k*sample_per_segment, (k+1)*sample_per_segment)
+            segments.append({'t0':a, 't1':b, 't':seg_t, 'UV':all_uv[rows], 'pts3d':all_pts3d[rows]})
     return segments, intersections, (spine, ts), (trim_pts, ss)
 
 # Build multi-surf
@@ -257,6 +332,15 @@ else:
                 th = ((t-0.75)/0.25) * (np.pi/2)
                 u = cx + (w/2 - r) + r*np.cos(th+3*np.pi/2); v = cy - (h/2 - r) + r*np.sin(th+3*np.pi/2)
             return [u, v]
+        def evaluate_list(self, ss):
+            # evaluate_single for all parameters at once, each quarter of the parameter range is one rounded corner
+            cx, cy = 1.5, 0.75; w, h, r = 2.0, 1.0, 0.25
+            t = np.mod(np.asarray(ss, dtype=float), 1.0)
+            quad = np.minimum((t/0.25).astype(np.int64), 3)
+            th = ((t - 0.25*quad)/0.25) * (np.pi/2) + quad*(np.pi/2)
+            u = cx + np.array([1, -1, -1, 1])[quad]*(w/2 - r) + r*np.cos(th)
+            v = cy + np.array([1, 1, -1, -1])[quad]*(h/2 - r) + r*np.sin(th)
+            return np.column_stack((u, v))
         def derivatives(self, s, order=1):
             p = np.array(self.evaluate_single(s))
             h = 1e-6
@@ -290,24 +374,16 @@ ax1.set_title('Global UV-space'); ax1.axis('equal'); ax1.legend()
 
 ax2 = fig.add_subplot(1,2,2, projection='3d')
 # plot patches
-Ugrid, Vgrid = np.meshgrid(np.linspace(0,1,8), np.linspace(0,1,8))
-for (pi,pj), (surf_eval,_,_) in multi_surf.patches:
-    pts = np.array([surf_eval(u,v) for u,v in zip(Ugrid.flatten(), Vgrid.flatten())])
-    X = pts[:,0].reshape(Ugrid.shape); Y = pts[:,1].reshape(Ugrid.shape); Z = pts[:,2].reshape(Ugrid.shape)
+# The basis on the fixed 8x8 grid is the same for every patch, rows of the grid run along v
+B_grid = bernstein_basis(multi_surf.step, np.linspace(0,1,8), multi_surf.binomials)
+grid_pts = np.einsum('bi,aj,pijk->pabk', B_grid, B_grid, multi_surf.patch_ctrl)
+for pts in grid_pts:
+    X = pts[:,:,0]; Y = pts[:,:,1]; Z = pts[:,:,2]
     ax2.plot_surface(X, Y, Z, alpha=0.5, color='lightblue', linewidth=0)
 samp_t = np.linspace(0,1,200)
 samp_pts3d = spline_uv.evaluate3D(samp_t, multi_surf)
 ax2.plot(samp_pts3d[:,0], samp_pts3d[:,1], samp_pts3d[:,2], 'r--', lw=1.2, label='Spline mapped')
-trim_3d = []
-for Ux,Vx in trim_pts:
-    pi = int(np.floor(Ux)); pj = int(np.floor(Vx))
-    u_local = float(np.clip(Ux - pi, 0.0, 1.0)); v_local = float(np.clip(Vx - pj, 0.0, 1.0))
-    pidx = multi_surf.patch_from_coord(pi, pj)
-    if pidx is None:
-        trim_3d.append([np.nan, np.nan, np.nan])
-    else:
-        trim_3d.append(multi_surf.eval_patch(pidx, u_local, v_local))
-trim_3d = np.array(trim_3d)
+trim_3d = multi_surf.eval_global(trim_pts[:, 0], trim_pts[:, 1])
 ax2.plot(trim_3d[:,0], trim_3d[:,1], trim_3d[:,2], 'm-', lw=1.5, label='Trim mapped')
 for seg in segments:
     pts = seg['pts3d']; valid = ~np.isnan(pts[:,0])